@@ -0,0 +1,122 @@
+"""Compare the legacy ILIKE `search_text` filter with the tsvector path.
+
+Loads the bundled courses.csv into the configured database (existing rows are kept) and times
+both implementations over a mixed Chinese/English query set.
+
+    poetry run python3 -m benchmarks.course_search [--rounds 50]
+"""
+
+import argparse
+import ast
+import csv
+import statistics
+import time
+from pathlib import Path
+
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session
+
+from crud.course import CourseCRUD
+from db.db import SessionLocal, init_db
+from models.course import Course
+from schemas.course import CourseSearchParams
+
+CSV_PATH = Path(__file__).resolve().parent.parent / 'courses.csv'
+QUERIES = [
+    '英文',
+    '基礎學術英文',
+    '微積分',
+    '程式設計',
+    'A1',
+    'A1101',
+    '鍾淑玫',
+    'python',
+    '物理 實驗',
+]
+
+
+def _as_list(value: str) -> str:
+    if value.startswith('['):
+        return ','.join(ast.literal_eval(value))
+    return '' if value == 'None' else value
+
+
+def load_courses(db: Session) -> int:
+    rows = []
+    with open(CSV_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            row = {key: ('' if value == 'None' else value) for key, value in row.items()}
+            row['serialNumber'] = row['serialNumber'].zfill(3)
+            row['instructors'] = _as_list(row['instructors'])
+            row['tags'] = _as_list(row['tags'])
+            row['course_id'] = row['departmentId'] + row['serialNumber']
+            rows.append(row)
+
+    db.execute(
+        text(
+            'INSERT INTO courses (semester, "departmentId", "serialNumber", "attributeCode", '
+            '"systemCode", "forGrade", "forClass", category, "courseName", "courseNote", tags, '
+            'credits, instructors, course_id) VALUES (:semester, :departmentId, :serialNumber, '
+            ':attributeCode, :systemCode, :forGrade, :forClass, :category, :courseName, '
+            ':courseNote, :tags, :credits, :instructors, :course_id) '
+            'ON CONFLICT (course_id) DO NOTHING'
+        ),
+        rows,
+    )
+    db.commit()
+    return db.query(Course).count()
+
+
+def legacy_search(db: Session, search_text: str, limit: int = 10):
+    """The six-way ILIKE filter `search_courses` used before the tsvector column existed."""
+    search_term = f'%{search_text}%'
+    query = db.query(Course).filter(
+        or_(
+            Course.courseName.ilike(search_term),
+            Course.courseNote.ilike(search_term),
+            Course.tags.ilike(search_term),
+            Course.instructors.ilike(search_term),
+            Course.departmentId.ilike(search_term),
+            Course.serialNumber.ilike(search_term),
+        )
+    )
+    return query.count(), query.limit(limit).all()
+
+
+def tsvector_search(db: Session, search_text: str, limit: int = 10):
+    result = CourseCRUD.search_courses(db, CourseSearchParams(search_text=search_text), 0, limit)
+    return result.total, result.data
+
+
+def timed(fn, db: Session, search_text: str, rounds: int) -> tuple[float, int]:
+    samples = []
+    total = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        total, _ = fn(db, search_text)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f'{load_courses(db)} courses loaded')
+        print(f'{"query":<16}{"legacy ms":>12}{"hits":>8}{"tsvector ms":>14}{"hits":>8}')
+        for search_text in QUERIES:
+            legacy_ms, legacy_hits = timed(legacy_search, db, search_text, args.rounds)
+            new_ms, new_hits = timed(tsvector_search, db, search_text, args.rounds)
+            print(
+                f'{search_text:<16}{legacy_ms:>12.2f}{legacy_hits:>8}{new_ms:>14.2f}{new_hits:>8}'
+            )
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
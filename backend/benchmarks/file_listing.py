@@ -0,0 +1,129 @@
+"""Compare the ORM and the projection read paths of `get_files_by_course`.
+
+Seeds one course with --files synthetic uploads in the configured database (removed afterwards)
+and times, with a fresh session per round:
+
+- orm: `db.query(File)` hydrating mapped objects, then `FileResponse.model_validate` per file
+- projection: a Core select of the listed columns into FileRow, validated by one TypeAdapter
+
+and reports the peak memory allocated by one listing.
+
+    poetry run python3 -m benchmarks.file_listing [--files 2000] [--rounds 30]
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, text
+
+from crud.file import FILE_COLUMNS, FILE_LIST, _file_rows
+from db.db import SessionLocal, init_db
+from models.file import ExamType, File
+from schemas.file import FileResponse as FileResponseSchema
+
+USER_ID = 'benchmark-user'
+COURSE_ID = 'BENCH001'
+
+
+def seed(db, files: int) -> None:
+    db.execute(
+        text(
+            'INSERT INTO users (user_id, username, email, timestamp, is_profile_completed) '
+            "VALUES (:user_id, 'benchmark', 'benchmark@example.com', now(), true) "
+            'ON CONFLICT (user_id) DO NOTHING'
+        ),
+        {'user_id': USER_ID},
+    )
+    db.execute(
+        text(
+            'INSERT INTO courses '
+            '(semester, "departmentId", "serialNumber", "courseName", course_id) '
+            "VALUES ('1131', 'BENCH', '001', 'Benchmark', :course_id) "
+            'ON CONFLICT (course_id) DO NOTHING'
+        ),
+        {'course_id': COURSE_ID},
+    )
+    start = datetime(2024, 9, 1, 9, 0)
+    db.execute(
+        File.__table__.insert(),
+        [
+            {
+                'file_id': f'bench-{i:06d}',
+                'filename': f'期中考 {i}.pdf',
+                'file_location': f'{USER_ID}/bench-{i:06d}',
+                'user_id': USER_ID,
+                'course_id': COURSE_ID,
+                'exam_type': list(ExamType)[i % len(ExamType)].value,
+                'info': '含詳解' if i % 3 else None,
+                'anonymous': bool(i % 2),
+                'timestamp': start + timedelta(minutes=i),
+            }
+            for i in range(files)
+        ],
+    )
+    db.commit()
+
+
+def cleanup(db) -> None:
+    db.execute(delete(File).where(File.course_id == COURSE_ID))
+    db.commit()
+
+
+def orm_listing(db):
+    files = db.query(File).filter(File.course_id == COURSE_ID).all()
+    return [FileResponseSchema.model_validate(file) for file in files]
+
+
+def projection_listing(db):
+    return FILE_LIST.validate_python(
+        _file_rows(db, select(*FILE_COLUMNS).where(File.course_id == COURSE_ID)),
+        from_attributes=True,
+    )
+
+
+def measure(session_factory, fn, rounds: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(rounds):
+        with session_factory() as db:
+            start = time.perf_counter()
+            fn(db)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    with session_factory() as db:
+        tracemalloc.start()
+        fn(db)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return statistics.median(samples), peak / 1024
+
+
+def report(session_factory, rounds: int) -> None:
+    print(f'{"path":<12}{"median ms":>12}{"peak KiB":>12}')
+    for name, fn in (('orm', orm_listing), ('projection', projection_listing)):
+        ms, kib = measure(session_factory, fn, rounds)
+        print(f'{name:<12}{ms:>12.2f}{kib:>12.0f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=30)
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as db:
+        cleanup(db)
+        seed(db, args.files)
+    try:
+        print(f'{args.files} files in course {COURSE_ID}')
+        report(SessionLocal, args.rounds)
+    finally:
+        with SessionLocal() as db:
+            cleanup(db)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Compare response serialization CPU for large file lists.
+
+Times what a `get_files_by_course` response costs to turn into bytes:
+
+- fastapi+json: FastAPI's default path, re-validating against response_model and rendering with
+  the standard library encoder
+- fastapi+orjson: the same re-validation, rendered by ORJSONResponse (the app default)
+- model bytes: ModelResponse, pydantic-core serializing the validated model directly
+
+    poetry run python3 -m benchmarks.serialization [--rounds 200]
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from models.file import ExamType
+from schemas.common import ResponseModel
+from schemas.file import FileResponse as FileResponseSchema
+from utils.response import ModelResponse
+
+SIZES = [20, 200, 2000]
+FIELD = create_model_field(
+    name='Response', type_=ResponseModel[List[FileResponseSchema]], mode='serialization'
+)
+
+
+def make_response(size: int) -> ResponseModel:
+    start = datetime(2024, 9, 1, 9, 0)
+    files = [
+        FileResponseSchema(
+            file_id=f'{i:08x}-5f1c-4c1e-9a55-2c6a4c0fd{i % 1000:03d}',
+            filename=f'微積分 期中考 {i}.pdf',
+            file_location=f'115261598260176932528/{i:08x}-5f1c-4c1e-9a55-2c6a4c0fd000',
+            user_id='115261598260176932528',
+            course_id='A1101',
+            exam_type=list(ExamType)[i % len(ExamType)],
+            info='第一次期中考，含詳解' if i % 3 else None,
+            anonymous=bool(i % 2),
+            timestamp=start + timedelta(minutes=i),
+        )
+        for i in range(size)
+    ]
+    return ResponseModel(status='success', data=files)
+
+
+def fastapi_body(response: ResponseModel, response_class) -> bytes:
+    # For async routes serialize_response never suspends, so drive it without an event loop
+    coroutine = serialize_response(field=FIELD, response_content=response)
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return response_class(done.value).body
+    raise RuntimeError('serialize_response suspended')
+
+
+def timed(fn, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.process_time()
+        fn()
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f'{"files":>6}{"fastapi+json ms":>18}{"fastapi+orjson ms":>20}{"model bytes ms":>17}')
+    for size in SIZES:
+        response = make_response(size)
+        rounds = max(args.rounds * 20 // size, 5)
+        legacy = timed(lambda: fastapi_body(response, JSONResponse), rounds)
+        orjson = timed(lambda: fastapi_body(response, ORJSONResponse), rounds)
+        direct = timed(lambda: ModelResponse(response).body, rounds)
+        print(f'{size:>6}{legacy:>18.3f}{orjson:>20.3f}{direct:>17.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,9 @@ class Settings(BaseSettings):
     google_client_id: str
     google_client_secret: str
     google_allowed_domains: str
+    # Overridable so the OAuth callback can run against a local stand-in server
+    google_token_uri: str = 'https://oauth2.googleapis.com/token'
+    google_certs_uri: str = 'https://www.googleapis.com/oauth2/v1/certs'
     jwt_secret_key: str
     jwt_algorithm: str
     jwt_access_token_expire_minutes: str
@@ -31,6 +34,21 @@ class Settings(BaseSettings):
     redis_password: str = ""
     redis_db: int = 0
     
+    # Memory-mapped course suggestion index shared by all workers on a host
+    suggest_index_path: str = '/tmp/pastexam-course-suggest.idx'
+
+    # Download links: presigned GETs for private buckets (off: plain public URLs). Links are
+    # signed per aligned window of minio_presign_window_seconds and stay valid for two windows.
+    minio_presigned_downloads: bool = False
+    minio_presign_window_seconds: int = 3600
+    minio_region: str = 'us-east-1'
+    # Downloads streamed through the backend: concurrent storage connections per worker
+    download_max_connections: int = 500
+
+    # Server-sent event streams held open per worker process, and their idle heartbeat
+    event_stream_max_connections: int = 2000
+    event_stream_heartbeat_seconds: int = 15
+
     frontend_api_url: str
     frontend_file_server_url: str
 
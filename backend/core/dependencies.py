@@ -1,8 +1,16 @@
 from functools import lru_cache
+from typing import Dict, Optional
+
+import httpx
+from fastapi import Cookie
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from core.config import get_settings
+from services.auth import JWTService
 from services.cache import CacheService
+from services.catalog import CourseCatalog
+from services.events import EventBroker
+from services.suggest import SuggestIndex
 
 settings = get_settings()
 
@@ -27,4 +35,48 @@ def get_cache_service() -> CacheService:
 
 # Dependency to get cache service
 def get_cache() -> CacheService:
-    return get_cache_service() 
\ No newline at end of file
+    return get_cache_service()
+
+# Event fan-out for the SSE feed (one listener per worker process)
+@lru_cache()
+def get_event_broker() -> EventBroker:
+    return EventBroker(get_cache_service())
+
+# Pooled HTTP client for outbound calls (one per worker process, closed on shutdown)
+@lru_cache()
+def get_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0), limits=httpx.Limits(max_keepalive_connections=20)
+    )
+
+# Streaming client for object storage downloads; connections are held for a whole download, so it
+# gets its own pool instead of sharing the outbound API client's
+@lru_cache()
+def get_storage_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(30.0, connect=5.0, pool=10.0),
+        limits=httpx.Limits(
+            max_connections=settings.download_max_connections, max_keepalive_connections=50
+        ),
+    )
+
+# Course catalog singleton (one per worker process)
+@lru_cache()
+def get_course_catalog() -> CourseCatalog:
+    return CourseCatalog()
+
+# Course suggestion index reader (one mapping per worker process)
+@lru_cache()
+def get_suggest_index() -> SuggestIndex:
+    return SuggestIndex(settings.suggest_index_path)
+
+# Verified claims of the caller's token cookie; FastAPI resolves it once per request and
+# JWTService caches the signature check across requests
+def get_current_user(token: str | None = Cookie(default=None)) -> Dict:
+    return JWTService().verify_token(token)
+
+# Like get_current_user, but anonymous callers get None instead of a 401
+def get_optional_user(token: str | None = Cookie(default=None)) -> Optional[Dict]:
+    if not token:
+        return None
+    return JWTService().verify_token(token)
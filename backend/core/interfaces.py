@@ -14,6 +14,10 @@ class OAuthProvider(ABC):
     def process_oauth_callback(self, db: Session, code: str) -> Dict:
         pass
 
+    @abstractmethod
+    async def process_oauth_callback_async(self, db: Session, code: str) -> Dict:
+        pass
+
     @abstractmethod
     def verify_email_domain(self, email: str) -> bool:
         pass
@@ -1,18 +1,31 @@
-import os
-from urllib.parse import quote_plus
+"""
+Import course CSV exports into the courses table.
+
+    python3 crawler.py combined_courses_1130_1131.csv [more.csv ...] [--chunk-size 2000]
 
-import pandas as pd
-from sqlalchemy import create_engine, text
+Each file is streamed in chunks into a temporary staging table with COPY, then merged into
+courses with one upsert: new course ids are inserted and changed rows updated. Files are imported
+in parallel, one connection each. Once every file is merged, courses of the imported semesters
+that no file lists anymore are deleted in one statement (unless files still reference them), the
+instructor/tag tables are rebuilt and the Redis cache versions of the changed courses are bumped.
+API workers pick up the new catalog from its Postgres fingerprint.
+"""
 
-df = pd.DataFrame()
+import argparse
+import ast
+import csv
+import io
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import quote_plus
 
-with open('combined_courses_1130_1131.csv', 'r') as f:
-    df = pd.read_csv(
-        f, na_values=[], keep_default_na=False, dtype=str
-    )  # Read all as string initially
-    # Replace 'nan' strings with actual NaN
-    df = df.replace('nan', pd.NA)
+import redis
+from sqlalchemy import create_engine
 
+from utils.course import index_tokens, sync_course_relations
 
 # Database connection parameters
 user = os.getenv('POSTGRES_USER')
@@ -23,61 +36,254 @@ dbname = os.getenv('POSTGRES_DB')
 
 DB_PARAMS = {'dbname': dbname, 'user': user, 'password': password, 'host': host, 'port': port}
 
-# Create SQLAlchemy engine
-password = quote_plus(DB_PARAMS['password'])
-engine = create_engine(
-    f"postgresql://{DB_PARAMS['user']}:{password}@{DB_PARAMS['host']}:{DB_PARAMS['port']}/{DB_PARAMS['dbname']}"
+# Columns of the courses table that come from the CSV, in COPY order
+COLUMNS = [
+    'semester',
+    'departmentId',
+    'serialNumber',
+    'attributeCode',
+    'systemCode',
+    'forGrade',
+    'forClass',
+    'category',
+    'courseName',
+    'courseNote',
+    'tags',
+    'credits',
+    'instructors',
+    'course_id',
+    'name_tokens',
+]
+QUOTED = ', '.join(f'"{column}"' for column in COLUMNS)
+# Compared to decide whether an existing course changed (course_id is the conflict key)
+COMPARED = [column for column in COLUMNS if column != 'course_id']
+
+# CSV COPY reads unquoted empty fields as NULL; the text columns keep them as '' like the CSV
+TEXT_QUOTED = ', '.join(f'"{column}"' for column in COLUMNS[:-1])
+COPY_STAGING = (
+    f'COPY course_staging ({QUOTED}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({TEXT_QUOTED}))'
+)
+COPY_IMPORTED = (
+    'COPY course_imported (course_id, semester) FROM STDIN '
+    'WITH (FORMAT csv, FORCE_NOT_NULL (course_id, semester))'
 )
 
-# Convert list columns to string representation for database storage
-df['instructors'] = df['instructors'].apply(lambda x: ','.join(x) if isinstance(x, list) else x)
-df['tags'] = df['tags'].apply(lambda x: ','.join(x) if isinstance(x, list) else x)
-
-# Drop columns that don't exist in the database model
-columns_to_drop = ['forClassGroup', 'courseLimit', 'required', 'selected', 'available', 'time']
-df = df.drop(columns=[col for col in columns_to_drop if col in df.columns])
-
-# Drop rows with NaN serialNumber
-df = df.dropna(subset=['serialNumber'])
-df = df[df['serialNumber'] != '<NA>']
-print(f'Number of rows after dropping NaN serialNumber: {len(df)}')
-print(df['serialNumber'])
-# Convert serialNumber from float string to int string
-# df['serialNumber'] = df['serialNumber'].astype(float).astype(int).astype(str)   
-df['serialNumber'] = df['serialNumber'].astype(str).str.zfill(3)
-df['course_id'] = df['departmentId'] + df['serialNumber']
-
-# Print rows with null course_id
-null_courses = df[df['course_id'].isna()]
-print('\nRows with null course_id:')
-print(null_courses)
-print(f'\nTotal rows with null course_id: {len(null_courses)}')
-print(df['course_id'])
-
-# Print rows with duplicate course_id
-dup_courses = df[df['course_id'].duplicated(keep=False)]
-print('\nRows with duplicate course_id:')
-print(dup_courses)
-print(f'\nTotal rows with duplicate course_id: {len(dup_courses)}')
-
-# Drop duplicate course_id entries (keep the first occurrence)
-df = df.drop_duplicates(subset=['course_id'], keep='first')
-print(f'\nRows after dropping duplicates: {len(df)}')
-
-
-# Create table and insert data
-try:
-
-    # Create new table and insert data
-    df.to_sql('courses', engine, if_exists='append', index=False)
-
-        
-
-    # Print table information
-    with engine.connect() as conn:
-        result = conn.execute(text('SELECT COUNT(*) FROM courses')).scalar()
-        print(f'Total records in database: {result}')
-
-except Exception as e:
-    print(f'\nError connecting to database: {str(e)}')
-    print('Please make sure PostgreSQL is running and the database parameters are correct.')
+STAGING_TABLE = f"""
+CREATE TEMP TABLE course_staging (
+    line serial,
+    {', '.join(f'"{column}" text' for column in COLUMNS[:-1])},
+    name_tokens text[]
+) ON COMMIT DROP
+"""
+
+UPSERT = f"""
+INSERT INTO courses ({QUOTED})
+SELECT {QUOTED} FROM (
+    SELECT DISTINCT ON (course_id) * FROM course_staging ORDER BY course_id, line
+) AS staged
+ORDER BY course_id
+ON CONFLICT (course_id) DO UPDATE SET
+    {', '.join(f'"{column}" = EXCLUDED."{column}"' for column in COMPARED)}
+WHERE ({', '.join(f'courses."{column}"' for column in COMPARED)})
+    IS DISTINCT FROM ({', '.join(f'EXCLUDED."{column}"' for column in COMPARED)})
+RETURNING course_id, semester, (xmax = 0) AS inserted
+"""
+
+STAGED_KEYS = 'SELECT DISTINCT course_id, semester FROM course_staging'
+
+IMPORTED_TABLE = """
+CREATE TEMP TABLE course_imported (course_id text, semester text) ON COMMIT DROP
+"""
+
+# Courses of the imported semesters that no imported file lists; courses with uploaded files
+# are kept so their files don't lose the course. Runs once after every file is merged, so two
+# files of the same semester never delete each other's courses.
+DELETE_STALE = """
+DELETE FROM courses c
+WHERE c.semester IN (SELECT DISTINCT semester FROM course_imported)
+  AND NOT EXISTS (SELECT 1 FROM course_imported i WHERE i.course_id = c.course_id)
+  AND NOT EXISTS (SELECT 1 FROM files f WHERE f.course_id = c.course_id)
+RETURNING c.course_id, c.semester
+"""
+
+
+def _text(value: str | None) -> str:
+    value = (value or '').strip()
+    return '' if value in ('None', 'nan') else value
+
+
+def _joined(value: str | None) -> str:
+    # courses.csv stores lists as Python literals, the combined export as plain strings
+    value = _text(value)
+    if value.startswith('['):
+        return ','.join(ast.literal_eval(value))
+    return value
+
+
+def read_courses(path: str) -> Iterator[Dict[str, str]]:
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            serial_number = _text(row.get('serialNumber'))
+            if not serial_number:
+                continue
+            course = {column: _text(row.get(column)) for column in COLUMNS[:-2]}
+            course['serialNumber'] = serial_number.zfill(3)
+            course['instructors'] = _joined(row.get('instructors'))
+            course['tags'] = _joined(row.get('tags'))
+            course['course_id'] = course['departmentId'] + course['serialNumber']
+            # Tokens are letters/digits only; quoting keeps a token like 'null' from becoming NULL
+            tokens = index_tokens(course['courseName'])
+            course['name_tokens'] = '{' + ','.join(f'"{token}"' for token in tokens) + '}'
+            yield course
+
+
+def copy_chunks(cursor, path: str, chunk_size: int) -> int:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    rows = 0
+
+    def flush() -> None:
+        buffer.seek(0)
+        cursor.copy_expert(COPY_STAGING, buffer)
+        buffer.seek(0)
+        buffer.truncate()
+
+    for course in read_courses(path):
+        writer.writerow([course[column] for column in COLUMNS])
+        rows += 1
+        if rows % chunk_size == 0:
+            flush()
+    if buffer.tell():
+        flush()
+    return rows
+
+
+def import_file(engine, path: str, chunk_size: int) -> Tuple[Dict[str, Counter], set, list]:
+    """Merge one file; returns its report, its changed course ids and the courses it lists."""
+    started = time.perf_counter()
+    report: Dict[str, Counter] = defaultdict(Counter)
+    changed = set()
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(STAGING_TABLE)
+            rows = copy_chunks(cursor, path, chunk_size)
+            cursor.execute(UPSERT)
+            for course_id, semester, inserted in cursor.fetchall():
+                report[semester]['inserted' if inserted else 'updated'] += 1
+                changed.add(course_id)
+            cursor.execute(STAGED_KEYS)
+            keys = cursor.fetchall()
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    print(f'{path}: {rows} rows staged in {time.perf_counter() - started:.2f}s')
+    return report, changed, keys
+
+
+def delete_stale(engine, keys: list) -> Tuple[Dict[str, Counter], set]:
+    """Delete the courses of the imported semesters that none of `keys` lists."""
+    report: Dict[str, Counter] = defaultdict(Counter)
+    deleted = set()
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(keys)
+    buffer.seek(0)
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(IMPORTED_TABLE)
+            cursor.copy_expert(COPY_IMPORTED, buffer)
+            cursor.execute(DELETE_STALE)
+            for course_id, semester in cursor.fetchall():
+                report[semester]['deleted'] += 1
+                deleted.add(course_id)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    return report, deleted
+
+
+def bump_course_versions(course_ids: set) -> None:
+    """
+    Give the pages of changed courses new validators so clients don't keep pre-import data.
+
+    Same version hashes as CacheService.bump_versions, written with a plain client so the crawler
+    doesn't need the backend's settings. A failure is raised: the import is committed by then, but
+    the API would keep answering with the old validators.
+    """
+    client = redis.Redis(
+        host=os.getenv('REDIS_HOST', 'localhost'),
+        port=int(os.getenv('REDIS_PORT', 6379)),
+        password=os.getenv('REDIS_PASSWORD') or None,
+        db=int(os.getenv('REDIS_DB', 0)),
+        socket_connect_timeout=5,
+    )
+    now = time.time()
+    pipeline = client.pipeline(transaction=False)
+    for course_id in sorted(course_ids):
+        pipeline.hsetnx(f'version:course:{course_id}', 'v', int(now * 1000))
+        pipeline.hincrby(f'version:course:{course_id}', 'v', 1)
+        pipeline.hset(f'version:course:{course_id}', 't', now)
+    try:
+        pipeline.execute()
+    except redis.RedisError as e:
+        raise RuntimeError(f'courses imported, but their cache versions were not bumped: {e}')
+    print(f'Bumped the versions of {len(course_ids)} courses')
+
+
+def main(paths: List[str], chunk_size: int) -> None:
+    engine = create_engine(
+        f"postgresql://{DB_PARAMS['user']}:{quote_plus(DB_PARAMS['password'])}"
+        f"@{DB_PARAMS['host']}:{DB_PARAMS['port']}/{DB_PARAMS['dbname']}",
+        pool_size=max(len(paths), 1),
+    )
+
+    with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        results = list(executor.map(lambda path: import_file(engine, path, chunk_size), paths))
+
+    changed = set()
+    keys = []
+    for _, file_changed, file_keys in results:
+        changed |= file_changed
+        keys.extend(file_keys)
+    stale_report, deleted = delete_stale(engine, keys)
+
+    totals: Dict[str, Counter] = defaultdict(Counter)
+    for report in [result[0] for result in results] + [stale_report]:
+        for semester, counts in report.items():
+            totals[semester].update(counts)
+    for semester in sorted(totals):
+        counts = totals[semester]
+        print(
+            f'semester {semester}: {counts["inserted"]} inserted, '
+            f'{counts["updated"]} updated, {counts["deleted"]} deleted'
+        )
+
+    # Refresh the normalized instructor/tag tables
+    with engine.begin() as conn:
+        sync_course_relations(conn)
+    bump_course_versions(changed | deleted)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['combined_courses_1130_1131.csv'])
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    try:
+        main(args.paths, args.chunk_size)
+    except Exception as e:
+        print(f'\nError importing courses: {str(e)}')
+        print(
+            'Please make sure PostgreSQL and Redis are running and the connection parameters are '
+            'correct.'
+        )
+        raise SystemExit(1)
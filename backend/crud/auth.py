@@ -1,15 +1,50 @@
+import asyncio
+import re
+import time
 from typing import Dict, Tuple
 
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from google.auth import jwt as google_jwt
 from google.auth.transport import requests
 from google.oauth2 import id_token
 from google_auth_oauthlib.flow import Flow
 from sqlalchemy.orm import Session
 
 from core.config import get_settings
+from core.dependencies import get_http_client
 from core.interfaces import OAuthProvider
 from crud.user import UserCRUD
 
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+class GoogleCertsCache:
+    """Google's ID token signing certificates, kept for as long as their Cache-Control allows."""
+
+    def __init__(self):
+        self.certs: Dict[str, str] = {}
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def get(self) -> Dict[str, str]:
+        if time.time() < self.expires_at:
+            return self.certs
+        async with self.lock:
+            # Another login may have refreshed them while we waited
+            if time.time() < self.expires_at:
+                return self.certs
+            response = await get_http_client().get(get_settings().google_certs_uri)
+            response.raise_for_status()
+            match = MAX_AGE_PATTERN.search(response.headers.get('cache-control', ''))
+            self.certs = response.json()
+            self.expires_at = time.time() + (int(match.group(1)) if match else 0)
+            return self.certs
+
+    def invalidate(self) -> None:
+        self.expires_at = 0.0
+
 
 class GoogleAuthProvider(OAuthProvider):
     def __init__(self):
@@ -29,6 +64,7 @@ class GoogleAuthProvider(OAuthProvider):
             'https://www.googleapis.com/auth/userinfo.profile',
         ]
         self.user_crud = UserCRUD()
+        self.certs_cache = GoogleCertsCache()
 
     def create_auth_flow(self) -> Tuple[str, str]:
         try:
@@ -93,6 +129,76 @@ class GoogleAuthProvider(OAuthProvider):
         except Exception:
             raise HTTPException(status_code=400, detail='Failed to process OAuth callback')
 
+    async def _verify_id_token(self, token: str) -> Dict:
+        settings = get_settings()
+        certs = await self.certs_cache.get()
+        if google_jwt.decode_header(token).get('kid') not in certs:
+            # Google rotated its keys before our cached copy expired; refetch once. Any other
+            # failure (expiry, audience, a bad signature under a known key) keeps the cache.
+            self.certs_cache.invalidate()
+            certs = await self.certs_cache.get()
+        user_info = google_jwt.decode(
+            token, certs=certs, audience=settings.google_client_id, clock_skew_in_seconds=60
+        )
+        if user_info.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError(f'Wrong issuer: {user_info.get("iss")}')
+        return user_info
+
+    async def process_oauth_callback_async(self, db: Session, code: str) -> Dict:
+        """
+        Non-blocking version of process_oauth_callback.
+
+        The code exchange goes through the shared pooled HTTP client, the ID token is checked
+        against cached signing certificates, and the user lookup runs in the threadpool, so a
+        burst of logins doesn't stall the event loop.
+        """
+        try:
+            settings = get_settings()
+            response = await get_http_client().post(
+                settings.google_token_uri,
+                data={
+                    'code': code,
+                    'client_id': settings.google_client_id,
+                    'client_secret': settings.google_client_secret,
+                    'redirect_uri': settings.google_redirect_uri,
+                    'grant_type': 'authorization_code',
+                },
+            )
+            response.raise_for_status()
+            tokens = response.json()
+
+            user_info = await self._verify_id_token(tokens['id_token'])
+
+            if not self.verify_email_domain(user_info['email']):
+                raise HTTPException(
+                    status_code=401, detail='Only NCKU accounts are allowed to use this service.'
+                )
+
+            google_user_info = {
+                'user_id': user_info['sub'],
+                'email': user_info['email'],
+                'username': user_info['name'],
+                'avatar': user_info.get('picture', ''),
+            }
+
+            user_response = await run_in_threadpool(
+                self.user_crud.get_or_create_user, db=db, google_user_info=google_user_info
+            )
+
+            expires_in = tokens.get('expires_in')
+            return {
+                'user': user_response.data.model_dump(),
+                'access_token': tokens.get('access_token'),
+                'refresh_token': tokens.get('refresh_token'),
+                'token_expiry': time.time() + expires_in if expires_in else None,
+            }
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f'OAuth callback error: {e}')
+            raise HTTPException(status_code=400, detail='Failed to process OAuth callback')
+
     def verify_email_domain(self, email: str) -> bool:
         settings = get_settings()
         return email.endswith(f'@{settings.google_allowed_domains}')
@@ -1,48 +1,109 @@
-from typing import List, Optional
+from typing import Dict, List
 
 from fastapi import HTTPException
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 
 from models.file import File
-from models.user import User
+from models.user import User, user_bookmarks
 from schemas.common import ResponseModel, ResponseStatus
 from schemas.file import FileResponse as FileResponseSchema
-from services.auth import JWTService
 from services.cache import CacheService
 
 
 class BookmarkCRUD:
-    def __init__(self):
-        self.jwt_service = JWTService()
+    def rebuild_bookmark_index(self, db: Session, user_id: str, cache: CacheService) -> set:
+        """Load a user's bookmarked file ids from the database into the Redis set"""
+        generation = cache.generation(f'user_bookmark_ids:{user_id}')
+        file_ids = set(
+            db.scalars(select(user_bookmarks.c.file_id).where(user_bookmarks.c.user_id == user_id))
+        )
+        cache.load_bookmark_set(user_id, file_ids, generation)
+        return file_ids
 
-    def add_bookmark(self, db: Session, token: str, file_id: str, cache: CacheService = None) -> ResponseModel[None]:
+    def bookmark_flags(
+        self, db: Session, user_id: str, file_ids: List[str], cache: CacheService = None
+    ) -> Dict[str, bool]:
+        """Whether `user_id` bookmarked each of `file_ids`"""
+        if cache:
+            flags = cache.get_bookmark_flags(user_id, file_ids)
+            if flags is not None:
+                return dict(zip(file_ids, flags))
+            if cache.redis_available:
+                # Cold start: load the whole set once, later checks are SMISMEMBER only
+                bookmarked = self.rebuild_bookmark_index(db, user_id, cache)
+                return {file_id: file_id in bookmarked for file_id in file_ids}
+
+        # One probe of the (user_id, file_id) primary key for all ids
+        bookmarked = set(
+            db.scalars(
+                select(user_bookmarks.c.file_id).where(
+                    user_bookmarks.c.user_id == user_id,
+                    user_bookmarks.c.file_id.in_(file_ids),
+                )
+            )
+        )
+        return {file_id: file_id in bookmarked for file_id in file_ids}
+
+    def _bookmark_count(self, db: Session, file_id: str, cache: CacheService = None) -> int:
+        if cache:
+            count = cache.get_bookmark_count(file_id)
+            if count is not None:
+                return count
+        file_exists, count = db.execute(
+            select(
+                exists().where(File.file_id == file_id),
+                select(func.count())
+                .select_from(user_bookmarks)
+                .where(user_bookmarks.c.file_id == file_id)
+                .scalar_subquery(),
+            )
+        ).one()
+        # No counter for ids that aren't files, so probing random ids can't fill Redis
+        if cache and file_exists:
+            cache.set_bookmark_count(file_id, count)
+        return count
+
+    def _raise_missing(self, db: Session, user_id: str, file_id: str) -> None:
+        """Turn a failed write on user_bookmarks into the matching 404, if any."""
+        file_exists, user_exists = db.execute(
+            select(
+                exists().where(File.file_id == file_id), exists().where(User.user_id == user_id)
+            )
+        ).one()
+        if not user_exists:
+            raise HTTPException(status_code=404, detail='User not found')
+        if not file_exists:
+            raise HTTPException(status_code=404, detail='File not found')
+
+    def add_bookmark(
+        self, db: Session, user_id: str, file_id: str, cache: CacheService = None
+    ) -> ResponseModel[None]:
         """Add a file to user's bookmarks"""
         try:
-            # Verify user token
-            user_data = self.jwt_service.verify_token(token)
-            user_id = user_data['user_id']
-            
-            # Get user and file
-            user = db.query(User).filter(User.user_id == user_id).first()
-            if not user:
-                raise HTTPException(status_code=404, detail='User not found')
-            
-            file = db.query(File).filter(File.file_id == file_id).first()
-            if not file:
-                raise HTTPException(status_code=404, detail='File not found')
-            
-            # Check if file is already bookmarked
-            if file in user.bookmarked_files:
+            # One indexed insert; the foreign keys validate the user and the file
+            try:
+                result = db.execute(
+                    insert(user_bookmarks)
+                    .values(user_id=user_id, file_id=file_id)
+                    .on_conflict_do_nothing()
+                )
+            except IntegrityError:
+                db.rollback()
+                self._raise_missing(db, user_id, file_id)
+                raise
+            if result.rowcount == 0:
                 raise HTTPException(status_code=400, detail='File is already bookmarked')
-            
-            # Add file to bookmarks
-            user.bookmarked_files.append(file)
             db.commit()
             
             # Invalidate cache
             if cache:
                 cache.delete_user_bookmarks_cache(user_id)
+                cache.add_bookmark_to_index(user_id, file_id)
+                cache.delete_feed(user_id)
+                cache.bump_versions([f'user:{user_id}'])
             
             return ResponseModel(
                 status=ResponseStatus.SUCCESS,
@@ -50,39 +111,34 @@ class BookmarkCRUD:
             )
             
         except HTTPException:
+            db.rollback()
             raise
         except Exception as e:
             db.rollback()
             print(f"Error adding bookmark: {e}")
             raise HTTPException(status_code=500, detail='Failed to add bookmark')
 
-    def remove_bookmark(self, db: Session, token: str, file_id: str, cache: CacheService = None) -> ResponseModel[None]:
+    def remove_bookmark(
+        self, db: Session, user_id: str, file_id: str, cache: CacheService = None
+    ) -> ResponseModel[None]:
         """Remove a file from user's bookmarks"""
         try:
-            # Verify user token
-            user_data = self.jwt_service.verify_token(token)
-            user_id = user_data['user_id']
-            
-            # Get user and file
-            user = db.query(User).filter(User.user_id == user_id).first()
-            if not user:
-                raise HTTPException(status_code=404, detail='User not found')
-            
-            file = db.query(File).filter(File.file_id == file_id).first()
-            if not file:
-                raise HTTPException(status_code=404, detail='File not found')
-            
-            # Check if file is bookmarked
-            if file not in user.bookmarked_files:
+            result = db.execute(
+                delete(user_bookmarks).where(
+                    user_bookmarks.c.user_id == user_id, user_bookmarks.c.file_id == file_id
+                )
+            )
+            if result.rowcount == 0:
+                self._raise_missing(db, user_id, file_id)
                 raise HTTPException(status_code=400, detail='File is not bookmarked')
-            
-            # Remove file from bookmarks
-            user.bookmarked_files.remove(file)
             db.commit()
             
             # Invalidate cache
             if cache:
                 cache.delete_user_bookmarks_cache(user_id)
+                cache.remove_bookmark_from_index(user_id, file_id)
+                cache.delete_feed(user_id)
+                cache.bump_versions([f'user:{user_id}'])
             
             return ResponseModel(
                 status=ResponseStatus.SUCCESS,
@@ -90,19 +146,18 @@ class BookmarkCRUD:
             )
             
         except HTTPException:
+            db.rollback()
             raise
         except Exception as e:
             db.rollback()
             print(f"Error removing bookmark: {e}")
             raise HTTPException(status_code=500, detail='Failed to remove bookmark')
 
-    def get_bookmarks(self, db: Session, token: str, cache: CacheService = None) -> ResponseModel[List[FileResponseSchema]]:
+    def get_bookmarks(
+        self, db: Session, user_id: str, cache: CacheService = None
+    ) -> ResponseModel[List[FileResponseSchema]]:
         """Get all bookmarked files for the current user"""
         try:
-            # Verify user token
-            user_data = self.jwt_service.verify_token(token)
-            user_id = user_data['user_id']
-            
             # Try to get from cache first
             if cache:
                 cached_bookmarks = cache.get_user_bookmarks_cache(user_id)
@@ -113,15 +168,17 @@ class BookmarkCRUD:
                         message=f'Found {len(cached_bookmarks)} bookmarked files'
                     )
             
-            # Get user with bookmarked files
-            user = db.query(User).filter(User.user_id == user_id).first()
-            if not user:
-                raise HTTPException(status_code=404, detail='User not found')
-            
+            # The user's bookmarked files, straight off the (user_id, file_id) primary key
+            files = db.scalars(
+                select(File)
+                .join(user_bookmarks, user_bookmarks.c.file_id == File.file_id)
+                .where(user_bookmarks.c.user_id == user_id)
+            ).all()
+
             # Cache the result
             if cache:
                 bookmarks_data = []
-                for file in user.bookmarked_files:
+                for file in files:
                     bookmark_dict = {
                         "file_id": file.file_id,
                         "filename": file.filename,
@@ -139,7 +196,7 @@ class BookmarkCRUD:
             # Convert to response schema
             bookmarked_files = [
                 FileResponseSchema.model_validate(file) 
-                for file in user.bookmarked_files
+                for file in files
             ]
             
             return ResponseModel(
@@ -154,41 +211,19 @@ class BookmarkCRUD:
             print(f"Error getting bookmarks: {e}")
             raise HTTPException(status_code=500, detail='Failed to get bookmarks')
 
-    def check_bookmark_status(self, db: Session, token: str, file_id: str, cache: CacheService = None) -> ResponseModel[dict]:
+    def check_bookmark_status(
+        self, db: Session, user_id: str, file_id: str, cache: CacheService = None
+    ) -> ResponseModel[dict]:
         """Check if a file is bookmarked by the current user"""
         try:
-            # Verify user token
-            user_data = self.jwt_service.verify_token(token)
-            user_id = user_data['user_id']
-            
-            # Try to get from cache first
-            if cache:
-                cached_bookmarks = cache.get_user_bookmarks_cache(user_id)
-                if cached_bookmarks:
-                    for bookmark in cached_bookmarks:
-                        if bookmark.get('file_id') == file_id:
-                            return ResponseModel(
-                                status=ResponseStatus.SUCCESS,
-                                data={"is_bookmarked": True},
-                                message='Bookmark status retrieved successfully'
-                            )
-            
-            # Get user
-            user = db.query(User).filter(User.user_id == user_id).first()
-            if not user:
-                raise HTTPException(status_code=404, detail='User not found')
-            
-            # Check if file exists
-            file = db.query(File).filter(File.file_id == file_id).first()
-            if not file:
-                raise HTTPException(status_code=404, detail='File not found')
-            
-            # Check bookmark status
-            is_bookmarked = file in user.bookmarked_files
+            is_bookmarked = self.bookmark_flags(db, user_id, [file_id], cache)[file_id]
             
             return ResponseModel(
                 status=ResponseStatus.SUCCESS,
-                data={"is_bookmarked": is_bookmarked},
+                data={
+                    "is_bookmarked": is_bookmarked,
+                    "bookmark_count": self._bookmark_count(db, file_id, cache),
+                },
                 message='Bookmark status retrieved successfully'
             )
             
@@ -196,4 +231,21 @@ class BookmarkCRUD:
             raise
         except Exception as e:
             print(f"Error checking bookmark status: {e}")
-            raise HTTPException(status_code=500, detail='Failed to check bookmark status') 
\ No newline at end of file
+            raise HTTPException(status_code=500, detail='Failed to check bookmark status')
+
+    def check_bookmark_statuses(
+        self, db: Session, user_id: str, file_ids: List[str], cache: CacheService = None
+    ) -> ResponseModel[Dict[str, bool]]:
+        """Check which of `file_ids` are bookmarked by the current user"""
+        try:
+            return ResponseModel(
+                status=ResponseStatus.SUCCESS,
+                data=self.bookmark_flags(db, user_id, file_ids, cache),
+                message='Bookmark status retrieved successfully'
+            )
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error checking bookmark statuses: {e}")
+            raise HTTPException(status_code=500, detail='Failed to check bookmark status')
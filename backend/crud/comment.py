@@ -1,23 +1,52 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional
 
-from sqlalchemy import desc
+from sqlalchemy import desc, func, select, tuple_
 from sqlalchemy.orm import Session
 
 from models.comment import Comment
+from models.file import File
 from schemas.comment.main import CommentCreate
+from services.cache import CacheService
+from services.events import EventBroker
 
 
 class CommentCRUD:
     @staticmethod
-    def create_comment(comment: CommentCreate, db: Session) -> Comment:
+    def create_comment(
+        comment: CommentCreate, db: Session, events: EventBroker = None, cache: CacheService = None
+    ) -> Comment:
         if comment.commenter_id == '' or comment.content == '':
             raise ValueError('Neither commenter_id nor content can be EMPTY!')
 
+        course_id = None
+        if comment.file_id:
+            file = db.get(File, comment.file_id)
+            if file is None:
+                raise ValueError(f"file ID {comment.file_id} doesn't exist")
+            course_id = file.course_id
+
         try:
-            db_comment = Comment(commenter_id=comment.commenter_id, content=comment.content)
+            db_comment = Comment(
+                commenter_id=comment.commenter_id, content=comment.content, file_id=comment.file_id
+            )
             db.add(db_comment)
             db.commit()
             db.refresh(db_comment)
+            if cache and db_comment.file_id:
+                cache.invalidate_comment_count(db_comment.file_id)
+            if events:
+                events.publish(
+                    'comment.created',
+                    {
+                        'comment_id': db_comment.comment_id,
+                        'commenter_id': db_comment.commenter_id,
+                        'content': db_comment.content,
+                        'file_id': db_comment.file_id,
+                        'comment_time': db_comment.comment_time.isoformat(),
+                    },
+                    course_id,
+                )
             return db_comment
         except Exception as e:
             db.rollback()
@@ -26,18 +55,28 @@ class CommentCRUD:
     @staticmethod
     def read_all_comment(db: Session, skip: int = 0, limit: int = 10) -> List[Comment]:
         try:
-            comments = db.query(Comment).offset(skip).limit(limit).all()
+            comments = (
+                db.query(Comment)
+                .order_by(desc(Comment.comment_time), desc(Comment.comment_id))
+                .offset(skip)
+                .limit(limit)
+                .all()
+            )
             return comments
         except Exception as e:
             raise e
 
     @staticmethod
-    def read_comment_by_commenter(commenter_id: str, db: Session) -> List[Comment]:
+    def read_comment_by_commenter(
+        commenter_id: str, db: Session, skip: int = 0, limit: int = 50
+    ) -> List[Comment]:
         try:
             comments = (
                 db.query(Comment)
                 .filter(Comment.commenter_id == commenter_id)
                 .order_by(desc(Comment.comment_time))
+                .offset(skip)
+                .limit(limit)
                 .all()
             )
             return comments
@@ -45,7 +84,56 @@ class CommentCRUD:
             raise e
 
     @staticmethod
-    def delete_comment_by_id(comment_id: int, current_user: str, db: Session) -> Comment:
+    def read_thread(
+        file_id: str,
+        db: Session,
+        limit: int = 20,
+        after_time: Optional[datetime] = None,
+        after_id: int = 0,
+    ) -> List[Comment]:
+        """
+        A file's comments, oldest first.
+
+        Pages are keyset-based: pass the comment_time and comment_id of the last comment of the
+        previous page, so every page is one range scan of ix_comments_file_id_comment_time.
+        """
+        query = db.query(Comment).filter(Comment.file_id == file_id)
+        if after_time is not None:
+            query = query.filter(
+                tuple_(Comment.comment_time, Comment.comment_id) > tuple_(after_time, after_id)
+            )
+        return query.order_by(Comment.comment_time, Comment.comment_id).limit(limit).all()
+
+    @staticmethod
+    def get_comment_counts(
+        file_ids: List[str], db: Session, cache: CacheService = None
+    ) -> Dict[str, int]:
+        """Comment counts of many files: one MGET, then one GROUP BY for the uncached ones"""
+        file_ids = list(dict.fromkeys(file_ids))
+        counts = dict(zip(file_ids, cache.get_comment_counts(file_ids))) if cache else {}
+        missing = [file_id for file_id in file_ids if counts.get(file_id) is None]
+        if missing:
+            loaded = dict.fromkeys(missing, 0)
+            loaded.update(
+                db.execute(
+                    select(Comment.file_id, func.count())
+                    .where(Comment.file_id.in_(missing))
+                    .group_by(Comment.file_id)
+                ).all()
+            )
+            if cache:
+                cache.set_comment_counts(loaded)
+            counts.update(loaded)
+        return counts
+
+    @staticmethod
+    def delete_comment_by_id(
+        comment_id: int,
+        current_user: str,
+        db: Session,
+        events: EventBroker = None,
+        cache: CacheService = None,
+    ) -> Comment:
         try:
             comment = db.query(Comment).filter(Comment.comment_id == comment_id).first()
 
@@ -59,6 +147,12 @@ class CommentCRUD:
 
             db.delete(comment)
             db.commit()
+            if cache and comment.file_id:
+                cache.invalidate_comment_count(comment.file_id)
+            if events:
+                events.publish(
+                    'comment.deleted', {'comment_id': comment_id, 'file_id': comment.file_id}
+                )
             return comment
         except Exception as e:
             db.rollback()
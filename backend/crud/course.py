@@ -1,20 +1,70 @@
+from datetime import datetime
 from typing import List
 
 from fastapi import HTTPException
-from sqlalchemy import or_, func, and_
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
-from models.course import Course
+from models.course import (
+    Course,
+    CourseStat,
+    Instructor,
+    Tag,
+    course_instructors,
+    course_tags,
+)
+from models.file import File
 from schemas.common import ResponseModel
-from schemas.course import CourseResponse, CourseSearchParams
+from schemas.course import CourseResponse, CourseSearchParams, CourseStatsResponse
+from services.catalog import CourseCatalog
+from utils.course import is_cjk, query_tokens, search_terms
 
 
 class CourseCRUD:
+    @staticmethod
+    def _name_contains(term: str):
+        # Exact token lookup on ix_courses_name_tokens, then a substring recheck on the candidates
+        return and_(
+            Course.name_tokens.contains(query_tokens(term)), Course.courseName.ilike(f'%{term}%')
+        )
+
+    @staticmethod
+    def _term_condition(term: str):
+        # Prefix match against the weighted tsvector, served by ix_courses_search_vector
+        condition = Course.search_vector.op('@@')(func.to_tsquery('simple', f'{term}:*'))
+        if is_cjk(term):
+            # Postgres keeps a CJK run as one token, so '英文' needs a substring match to find
+            # '基礎學術英文': names go through their tokens, instructors and notes are short
+            condition = or_(
+                condition,
+                CourseCRUD._name_contains(term),
+                Course.instructors.ilike(f'%{term}%'),
+                Course.courseNote.ilike(f'%{term}%'),
+            )
+        return condition
+
     @staticmethod
     def search_courses(
-        db: Session, search_params: CourseSearchParams, offset: int = 0, limit: int = 10
+        db: Session,
+        search_params: CourseSearchParams,
+        offset: int = 0,
+        limit: int = 10,
+        catalog: CourseCatalog = None,
     ) -> ResponseModel[List[CourseResponse]]:
         try:
+            # Answer from the in-memory catalog when possible
+            if catalog:
+                result = catalog.search(db, search_params, offset, limit)
+                if result is not None:
+                    total, courses = result
+                    return ResponseModel(
+                        status='success',
+                        data=courses,
+                        message=f'Found {total} courses',
+                        total=total,
+                    )
+
             query = db.query(Course)
 
             # Apply filters based on search parameters
@@ -45,6 +95,10 @@ class CourseCRUD:
                 # Build a list of conditions for each word
                 word_conditions = []
                 for word in search_words:
+                    if is_cjk(word):
+                        # Trigrams are unselective for short CJK words; use the bigram tokens
+                        word_conditions.append(CourseCRUD._name_contains(word))
+                        continue
                     word_conditions.append(
                         or_(
                             Course.courseName.ilike(f'%{word}%'),  # Partial match
@@ -69,20 +123,33 @@ class CourseCRUD:
                 query = query.filter(Course.instructors.ilike(f'%{search_params.instructors}%'))
             if search_params.course_id:
                 query = query.filter(Course.course_id == search_params.course_id)
+            if search_params.instructor:
+                query = query.filter(
+                    Course.course_id.in_(
+                        select(course_instructors.c.course_id)
+                        .join(Instructor)
+                        .where(Instructor.name == search_params.instructor)
+                    )
+                )
+            if search_params.tag:
+                query = query.filter(
+                    Course.course_id.in_(
+                        select(course_tags.c.course_id)
+                        .join(Tag)
+                        .where(Tag.name == search_params.tag)
+                    )
+                )
 
             # Full-text search across multiple fields if search_text is provided
             if search_params.search_text:
-                search_term = f'%{search_params.search_text}%'
-                query = query.filter(
-                    or_(
-                        Course.courseName.ilike(search_term),
-                        Course.courseNote.ilike(search_term),
-                        Course.tags.ilike(search_term),
-                        Course.instructors.ilike(search_term),
-                        Course.departmentId.ilike(search_term),
-                        Course.serialNumber.ilike(search_term),
+                terms = search_terms(search_params.search_text)
+                if terms:
+                    query = query.filter(and_(*[CourseCRUD._term_condition(t) for t in terms]))
+                    # Rank by terms hit and by field: name/code > people/tags > note
+                    any_term = func.to_tsquery('simple', ' | '.join(f'{t}:*' for t in terms))
+                    query = query.order_by(
+                        func.ts_rank_cd(Course.search_vector, any_term).desc(), Course.course_id
                     )
-                )
 
             # Apply pagination
             total = query.count()
@@ -99,8 +166,15 @@ class CourseCRUD:
             raise HTTPException(status_code=500, detail=f'Failed to search courses: {str(e)}')
 
     @staticmethod
-    def get_course_by_id(db: Session, course_id: str) -> ResponseModel[CourseResponse]:
+    def get_course_by_id(
+        db: Session, course_id: str, catalog: CourseCatalog = None
+    ) -> ResponseModel[CourseResponse]:
         try:
+            if catalog:
+                course = catalog.get(db, course_id)
+                if course:
+                    return ResponseModel(status='success', data=course)
+
             course = db.query(Course).filter(Course.course_id == course_id).first()
             if not course:
                 raise HTTPException(status_code=404, detail=f'Course with id {course_id} not found')
@@ -113,3 +187,58 @@ class CourseCRUD:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f'Failed to get course: {str(e)}')
+
+    @staticmethod
+    def record_file_added(db: Session, course_id: str, exam_type: str, timestamp: datetime) -> None:
+        """Count a new file in course_stats; runs in the caller's transaction."""
+        statement = insert(CourseStat).values(
+            course_id=course_id, exam_type=exam_type, file_count=1, latest_upload=timestamp
+        )
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[CourseStat.course_id, CourseStat.exam_type],
+                set_={
+                    'file_count': CourseStat.file_count + 1,
+                    'latest_upload': func.greatest(CourseStat.latest_upload, timestamp),
+                },
+            )
+        )
+
+    @staticmethod
+    def record_file_removed(db: Session, course_id: str, exam_type: str) -> None:
+        """Uncount a file in course_stats; call after the file row is deleted, before commit."""
+        db.flush()
+        latest = (
+            select(func.max(File.timestamp))
+            .where(File.course_id == course_id, File.exam_type == exam_type)
+            .scalar_subquery()
+        )
+        db.execute(
+            update(CourseStat)
+            .where(CourseStat.course_id == course_id, CourseStat.exam_type == exam_type)
+            .values(file_count=func.greatest(CourseStat.file_count - 1, 0), latest_upload=latest)
+        )
+
+    @staticmethod
+    def get_course_stats(
+        db: Session, course_ids: List[str]
+    ) -> ResponseModel[List[CourseStatsResponse]]:
+        try:
+            stats = {
+                course_id: CourseStatsResponse(course_id=course_id) for course_id in course_ids
+            }
+            rows = db.query(CourseStat).filter(CourseStat.course_id.in_(course_ids)).all()
+            for row in rows:
+                course_stats = stats[row.course_id]
+                course_stats.by_exam_type[row.exam_type] = row.file_count
+                course_stats.total_files += row.file_count
+                if row.latest_upload and (
+                    course_stats.latest_upload is None
+                    or row.latest_upload > course_stats.latest_upload
+                ):
+                    course_stats.latest_upload = row.latest_upload
+
+            return ResponseModel(status='success', data=list(stats.values()))
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f'Failed to get course stats: {str(e)}')
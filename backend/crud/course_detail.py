@@ -0,0 +1,133 @@
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import get_settings
+from crud.bookmark import BookmarkCRUD
+from crud.course import CourseCRUD
+from crud.file import FILE_COLUMNS, _file_rows
+from crud.user import UserCRUD
+from models.file import File
+from schemas.common import ResponseModel, ResponseStatus
+from schemas.course import CourseDetailFile, CourseDetailResponse, CourseStatsResponse
+from services.cache import CacheService
+from services.catalog import CourseCatalog
+from services.minio import MinioService
+
+DETAIL_FILES = TypeAdapter(List[CourseDetailFile])
+# Anonymous files are streamed by id: a presigned link would carry the storage path, which starts
+# with the uploader id
+ANONYMOUS_DOWNLOAD_PATH = '/api/v1/file/{file_id}/download'
+
+
+class CourseDetailCRUD:
+    """
+    Everything a course page shows, in one response.
+
+    The files and stats are the same for every caller and are cached per course version (bumped by
+    every upload and delete in the course). Uploader profiles come from their own cache with one
+    MGET, and the bookmark flags are looked up per caller with one SMISMEMBER. Anonymous files
+    carry neither the uploader id nor the storage path.
+    """
+
+    def __init__(self):
+        self.bookmark_crud = BookmarkCRUD()
+        self.minio_service = MinioService()
+        self.settings = get_settings()
+
+    @staticmethod
+    def _shared(
+        db: Session, course_id: str, version: Optional[str], cache: CacheService = None
+    ) -> Tuple[List[CourseDetailFile], CourseStatsResponse]:
+        if cache and version is not None:
+            cached = cache.get_course_detail_cache(course_id, version)
+            if cached is not None:
+                return (
+                    DETAIL_FILES.validate_python(cached['files']),
+                    CourseStatsResponse.model_validate(cached['stats']),
+                )
+
+        rows = _file_rows(
+            db,
+            select(*FILE_COLUMNS)
+            .where(File.course_id == course_id)
+            .order_by(File.timestamp.desc()),
+        )
+        for row in rows:
+            if row.anonymous:
+                row.user_id = None
+                row.file_location = None
+        files = DETAIL_FILES.validate_python(rows, from_attributes=True)
+        stats = CourseCRUD.get_course_stats(db, [course_id]).data[0]
+
+        if cache and version is not None:
+            cache.set_course_detail_cache(
+                course_id,
+                version,
+                {
+                    'files': DETAIL_FILES.dump_python(files, mode='json'),
+                    'stats': stats.model_dump(mode='json'),
+                },
+            )
+        return files, stats
+
+    def get_course_detail(
+        self,
+        db: Session,
+        course_id: str,
+        user_id: Optional[str] = None,
+        catalog: CourseCatalog = None,
+        cache: CacheService = None,
+    ) -> ResponseModel[CourseDetailResponse]:
+        try:
+            course = CourseCRUD.get_course_by_id(db, course_id, catalog).data
+
+            version = None
+            if cache:
+                versions = cache.get_versions([f'course:{course_id}'])
+                if versions is not None:
+                    version = versions[0][0]
+            files, stats = self._shared(db, course_id, version, cache)
+
+            # Overlays on the shared part: uploaders, the caller's bookmarks and download links
+            if files:
+                profiles = UserCRUD.get_uploader_profiles(
+                    db, [file.user_id for file in files if file.user_id], cache
+                )
+                flags = (
+                    self.bookmark_crud.bookmark_flags(
+                        db, user_id, [file.file_id for file in files], cache
+                    )
+                    if user_id
+                    else {}
+                )
+                urls = self.minio_service.get_presigned_urls(
+                    self.settings.minio_file_bucket,
+                    [file.file_location for file in files if file.file_location],
+                )
+                files = [
+                    file.model_copy(
+                        update={
+                            'uploader': profiles.get(file.user_id) if file.user_id else None,
+                            'is_bookmarked': flags.get(file.file_id, False),
+                            'download_url': urls.get(file.file_location)
+                            if file.file_location
+                            else ANONYMOUS_DOWNLOAD_PATH.format(file_id=file.file_id),
+                        }
+                    )
+                    for file in files
+                ]
+
+            return ResponseModel(
+                status=ResponseStatus.SUCCESS,
+                data=CourseDetailResponse(course=course, files=files, stats=stats),
+            )
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(e)
+            raise HTTPException(status_code=500, detail='Failed to fetch course detail.')
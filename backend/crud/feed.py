@@ -0,0 +1,137 @@
+from typing import List
+
+from fastapi import HTTPException
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+
+from models.file import File
+from models.user import user_bookmarks
+from schemas.common import ResponseModel, ResponseStatus
+from schemas.file import FileResponse as FileResponseSchema
+from services.cache import FEED_SIZE, CacheService
+
+
+class FeedCRUD:
+    """
+    Home feed: new files in the courses a user has bookmarked files of or uploaded to.
+
+    Uploads are pushed into the Redis feed of every follower of the course (fan-out on write), so
+    reading a feed is one sorted-set lookup. Courses with more than FANOUT_LIMIT followers are
+    marked popular instead; their followers' feeds merge in the course timeline when read.
+    """
+
+    FANOUT_LIMIT = 1000
+
+    @staticmethod
+    def _followed_courses(user_id: str):
+        bookmarked = (
+            select(File.course_id)
+            .join(user_bookmarks, user_bookmarks.c.file_id == File.file_id)
+            .where(user_bookmarks.c.user_id == user_id, File.course_id.is_not(None))
+        )
+        uploaded = select(File.course_id).where(
+            File.user_id == user_id, File.course_id.is_not(None)
+        )
+        return union(bookmarked, uploaded)
+
+    @staticmethod
+    def _followers(course_id: str):
+        bookmarkers = (
+            select(user_bookmarks.c.user_id)
+            .join(File, File.file_id == user_bookmarks.c.file_id)
+            .where(File.course_id == course_id)
+        )
+        uploaders = select(File.user_id).where(File.course_id == course_id)
+        return union(bookmarkers, uploaders)
+
+    @staticmethod
+    def fan_out(db: Session, file: File, cache: CacheService) -> None:
+        """Push a new upload into the feeds of its course's followers"""
+        if not file.course_id:
+            return
+        # The uploader now follows the course too
+        cache.delete_feed(file.user_id)
+        if cache.get_popular_courses([file.course_id]):
+            return
+
+        followers = FeedCRUD._followers(file.course_id)
+        user_ids = list(db.scalars(followers.limit(FeedCRUD.FANOUT_LIMIT + 1)))
+        if len(user_ids) > FeedCRUD.FANOUT_LIMIT:
+            # From now on this course is merged in at read time; feeds loaded before don't know
+            if cache.mark_popular_course(file.course_id):
+                cache.add_feed_pull(db.scalars(followers), file.course_id)
+            return
+
+        cache.add_to_timelines(
+            [f'feed:user:{user_id}' for user_id in user_ids if user_id != file.user_id],
+            file.file_id,
+            file.timestamp.timestamp(),
+            FEED_SIZE,
+        )
+
+    @staticmethod
+    def _load_feed(db: Session, user_id: str, limit: int, cache: CacheService = None) -> List[File]:
+        generation = cache.generation(f'feed:user:{user_id}') if cache else None
+        course_ids = list(db.scalars(FeedCRUD._followed_courses(user_id)))
+        files = []
+        if course_ids:
+            files = (
+                db.query(File)
+                .filter(File.course_id.in_(course_ids), File.user_id != user_id)
+                .order_by(File.timestamp.desc())
+                .limit(FEED_SIZE)
+                .all()
+            )
+        if cache:
+            cache.load_feed(
+                user_id,
+                ((f.file_id, f.timestamp.timestamp()) for f in files),
+                cache.get_popular_courses(course_ids),
+                generation,
+            )
+        return files[:limit]
+
+    @staticmethod
+    def get_feed(
+        db: Session, user_id: str, limit: int = 20, cache: CacheService = None
+    ) -> ResponseModel[List[FileResponseSchema]]:
+        """Newest files of the courses a user follows, excluding their own uploads."""
+        try:
+            feed = cache.get_feed(user_id, limit) if cache else None
+            if feed is None:
+                files = FeedCRUD._load_feed(db, user_id, limit, cache)
+            else:
+                file_ids, pulled = feed
+                file_ids = set(file_ids)
+                cold = []
+                for course_id in pulled:
+                    course_file_ids = cache.get_timeline(f'timeline:course:{course_id}', limit)
+                    if course_file_ids is None:
+                        cold.append(course_id)
+                    else:
+                        file_ids.update(course_file_ids)
+
+                files = []
+                if file_ids:
+                    files.extend(
+                        db.query(File).filter(File.file_id.in_(file_ids), File.user_id != user_id)
+                    )
+                if cold:
+                    files.extend(
+                        db.query(File)
+                        .filter(File.course_id.in_(cold), File.user_id != user_id)
+                        .order_by(File.timestamp.desc())
+                        .limit(limit)
+                    )
+                files = sorted(
+                    {f.file_id: f for f in files}.values(), key=lambda f: f.timestamp, reverse=True
+                )[:limit]
+
+            return ResponseModel(
+                status=ResponseStatus.SUCCESS,
+                data=[FileResponseSchema.model_validate(file) for file in files],
+            )
+
+        except Exception as e:
+            print(f'Error getting feed: {e}')
+            raise HTTPException(status_code=500, detail='Failed to fetch feed.')
@@ -1,19 +1,69 @@
+import asyncio
+import hashlib
 import os
+import tempfile
+from dataclasses import dataclass
 from typing import List, Optional
 from datetime import datetime, timezone, timedelta
 
-from fastapi import HTTPException, UploadFile
+import httpx
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Select, exists, select
 from sqlalchemy.orm import Session
 
 from core.config import get_settings
-from models.file import File
-from models.user import User
-from models.course import Course
+from crud.course import CourseCRUD
+from crud.feed import FeedCRUD
+from crud.user import UserCRUD
+from models.file import TAIWAN_TZ, ExamType, File
+from models.course import Course, Instructor, course_instructors
 from schemas.common import ResponseModel, ResponseStatus
 from schemas.file import FileCreate as FileCreateSchema
 from schemas.file import FileResponse as FileResponseSchema
 from services.minio import MinioService
-from services.cache import CacheService
+from services.cache import TIMELINE_SIZE, CacheService
+from services.events import EventBroker
+from utils.archive import ArchiveEntry, ArchiveStream
+from utils.download import content_disposition, stream_object
+
+# Columns of a file listing. Selecting them with Core returns plain rows, skipping ORM identity-map
+# bookkeeping, and the whole list is validated by one compiled adapter.
+FILE_COLUMNS = (
+    File.file_id,
+    File.filename,
+    File.file_location,
+    File.user_id,
+    File.course_id,
+    File.exam_type,
+    File.info,
+    File.anonymous,
+    File.timestamp,
+)
+FILE_LIST = TypeAdapter(List[FileResponseSchema])
+
+# Course archives being stored after their download, kept referenced until done
+archive_uploads = set()
+
+
+@dataclass(slots=True)
+class FileRow:
+    """One row of FILE_COLUMNS"""
+
+    file_id: str
+    filename: str
+    file_location: str
+    user_id: str
+    course_id: Optional[str]
+    exam_type: str
+    info: Optional[str]
+    anonymous: bool
+    timestamp: datetime
+
+
+def _file_rows(db: Session, statement: Select) -> List[FileRow]:
+    return [FileRow(*row) for row in db.execute(statement)]
 
 
 class FileCRUD:
@@ -22,6 +72,7 @@ class FileCRUD:
         self.settings = get_settings()
 
     UPLOAD_DIR = 'uploads'
+    ARCHIVE_PREFIX = '_archives'
     ALLOWED_EXTENSIONS = {'.pdf', '.doc', '.docx', '.txt'}
     MAX_FILE_SIZE = 10 * 1024 * 1024
 
@@ -37,12 +88,16 @@ class FileCRUD:
             raise HTTPException(status_code=400, detail='File extension not allowed.')
 
     async def create_file(
-        self, db: Session, file_data: FileCreateSchema, upload_file: UploadFile, cache: CacheService = None
+        self,
+        db: Session,
+        file_data: FileCreateSchema,
+        upload_file: UploadFile,
+        cache: CacheService = None,
+        events: EventBroker = None,
     ) -> ResponseModel[FileResponseSchema]:
         try:
             self._validate_file(upload_file)
-            user = db.query(User).filter(User.user_id == file_data.user_id).first()
-            if not user:
+            if not UserCRUD.get_cached_profile(db, file_data.user_id):
                 raise HTTPException(
                     status_code=404, detail=f'User with id ${file_data.user_id} not found.'
                 )
@@ -87,16 +142,33 @@ class FileCRUD:
                 db_file.timestamp = datetime.now(TAIWAN_TZ)
 
                 db.add(db_file)
+                if db_file.course_id:
+                    CourseCRUD.record_file_added(
+                        db, db_file.course_id, ExamType(db_file.exam_type).value, db_file.timestamp
+                    )
                 db.commit()
                 db.refresh(db_file)
 
                 # Invalidate related caches
                 if cache:
                     cache.invalidate_file_related_caches(
-                        str(db_file.id), 
+                        str(db_file.file_id), 
                         str(file_data.user_id), 
                         str(file_data.course_id)
                     )
+                    cache.add_to_timelines(
+                        self._timeline_keys(db_file.user_id, db_file.course_id),
+                        db_file.file_id,
+                        db_file.timestamp.timestamp(),
+                    )
+                    FeedCRUD.fan_out(db, db_file, cache)
+
+                if events:
+                    events.publish(
+                        'file.created',
+                        FileResponseSchema.model_validate(db_file).model_dump(mode='json'),
+                        db_file.course_id,
+                    )
 
                 return ResponseModel(
                     status=ResponseStatus.SUCCESS,
@@ -113,41 +185,56 @@ class FileCRUD:
         except Exception:
             raise HTTPException(status_code=500, detail='Failed to process file upload')
 
+    @staticmethod
+    def embed_uploaders(
+        db: Session, response: ResponseModel, cache: CacheService = None
+    ) -> ResponseModel:
+        """Attach uploader profiles to a file listing, resolving all distinct uploaders at once"""
+        files = response.data
+        profiles = UserCRUD.get_uploader_profiles(
+            db, [file.user_id for file in files if file and not file.anonymous], cache
+        )
+        # Copies, so cached listings keep no profiles
+        response.data = [
+            file if file is None or file.anonymous
+            else file.model_copy(update={'uploader': profiles.get(file.user_id)})
+            for file in files
+        ]
+        return response
+
+    def with_download_urls(self, response: ResponseModel) -> ResponseModel:
+        """Attach download links to a file listing, signed in one batch"""
+        urls = self.minio_service.get_presigned_urls(
+            self.settings.minio_file_bucket,
+            [file.file_location for file in response.data if file is not None],
+        )
+        response.data = [
+            file if file is None
+            else file.model_copy(update={'download_url': urls.get(file.file_location)})
+            for file in response.data
+        ]
+        return response
+
     def read_all_file(self, db: Session, user_id: str, cache: CacheService = None) -> ResponseModel[List[FileResponseSchema]]:
         try:
             # Try to get from cache first
             if cache:
                 cached_files = cache.get_user_files_cache(user_id)
-                if cached_files:
+                if cached_files is not None:
                     return ResponseModel(
-                        status=ResponseStatus.SUCCESS,
-                        data=[FileResponseSchema.model_validate(File(**file_data)) for file_data in cached_files],
+                        status=ResponseStatus.SUCCESS, data=FILE_LIST.validate_python(cached_files)
                     )
 
-            files = db.query(File).filter(File.user_id == user_id).all()
-            
+            files = FILE_LIST.validate_python(
+                _file_rows(db, select(*FILE_COLUMNS).where(File.user_id == user_id)),
+                from_attributes=True,
+            )
+
             # Cache the result
             if cache:
-                files_data = []
-                for file in files:
-                    file_dict = {
-                        "file_id": file.file_id,
-                        "filename": file.filename,
-                        "file_location": file.file_location,
-                        "user_id": str(file.user_id),
-                        "course_id": str(file.course_id) if file.course_id else None,
-                        "exam_type": file.exam_type,
-                        "info": file.info,
-                        "anonymous": file.anonymous,
-                        "timestamp": file.timestamp.isoformat() if file.timestamp else None
-                    }
-                    files_data.append(file_dict)
-                cache.set_user_files_cache(user_id, files_data)
-            
-            return ResponseModel(
-                status=ResponseStatus.SUCCESS,
-                data=[FileResponseSchema.model_validate(file) for file in files],
-            )
+                cache.set_user_files_cache(user_id, FILE_LIST.dump_python(files, mode='json'))
+
+            return ResponseModel(status=ResponseStatus.SUCCESS, data=files)
 
         except Exception:
             raise HTTPException(status_code=500, detail='Failed to fetch files.')
@@ -155,25 +242,81 @@ class FileCRUD:
     def get_files_by_course(self, db: Session, course_id: str, cache: CacheService = None) -> ResponseModel[List[FileResponseSchema]]:
         try:
             # Validate course exists
-            course = db.query(Course).filter(Course.course_id == course_id).first()
-            if not course:
+            if not db.scalar(select(exists().where(Course.course_id == course_id))):
                 raise HTTPException(status_code=404, detail=f'Course with id {course_id} not found')
 
             # Try to get from cache first
             if cache:
                 cached_files = cache.get_course_files_cache(course_id)
-                if cached_files:
+                if cached_files is not None:
                     return ResponseModel(
-                        status=ResponseStatus.SUCCESS,
-                        data=[FileResponseSchema.model_validate(File(**file_data)) for file_data in cached_files],
+                        status=ResponseStatus.SUCCESS, data=FILE_LIST.validate_python(cached_files)
                     )
 
-            files = db.query(File).filter(File.course_id == course_id).all()
-            
+            files = FILE_LIST.validate_python(
+                _file_rows(db, select(*FILE_COLUMNS).where(File.course_id == course_id)),
+                from_attributes=True,
+            )
+
             # Cache the result
             if cache:
-                files_data = []
-                for file in files:
+                cache.set_course_files_cache(course_id, FILE_LIST.dump_python(files, mode='json'))
+
+            return ResponseModel(status=ResponseStatus.SUCCESS, data=files)
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(e)
+            raise HTTPException(status_code=500, detail='Failed to fetch files for course.')
+
+    def get_files_by_instructor(
+        self, db: Session, instructor_name: str
+    ) -> ResponseModel[List[FileResponseSchema]]:
+        """Get files of every course taught by an instructor, most recent first."""
+        try:
+            instructor = db.query(Instructor).filter(Instructor.name == instructor_name).first()
+            if not instructor:
+                raise HTTPException(
+                    status_code=404, detail=f'Instructor {instructor_name} not found'
+                )
+
+            files = (
+                db.query(File)
+                .join(course_instructors, course_instructors.c.course_id == File.course_id)
+                .filter(course_instructors.c.instructor_id == instructor.instructor_id)
+                .order_by(File.timestamp.desc())
+                .all()
+            )
+
+            return ResponseModel(
+                status=ResponseStatus.SUCCESS,
+                data=[FileResponseSchema.model_validate(file) for file in files],
+            )
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(e)
+            raise HTTPException(status_code=500, detail='Failed to fetch files for instructor.')
+
+    def get_file_by_id(self, db: Session, file_id: str, cache: CacheService = None) -> ResponseModel[FileResponseSchema]:
+        try:
+            # Try to get from cache first
+            file_data = None
+            if cache:
+                cached_file = cache.get_file_cache(file_id)
+                if cached_file:
+                    file_data = FileResponseSchema.model_validate(cached_file)
+
+            if file_data is None:
+                file = db.query(File).filter(File.file_id == file_id).first()
+                if not file:
+                    raise HTTPException(status_code=404, detail=f'File with id {file_id} not found')
+                file_data = FileResponseSchema.model_validate(file)
+
+                # Cache the result (without the download URL)
+                if cache:
                     file_dict = {
                         "file_id": file.file_id,
                         "filename": file.filename,
@@ -185,75 +328,188 @@ class FileCRUD:
                         "anonymous": file.anonymous,
                         "timestamp": file.timestamp.isoformat() if file.timestamp else None
                     }
-                    files_data.append(file_dict)
-                cache.set_course_files_cache(course_id, files_data)
-            
-            return ResponseModel(
-                status=ResponseStatus.SUCCESS,
-                data=[FileResponseSchema.model_validate(file) for file in files],
+                    cache.set_file_cache(file_id, file_dict)
+
+            # Signed once per window, so cache hits mostly skip signing too
+            file_data.download_url = self.minio_service.get_presigned_url(
+                bucket_name=self.settings.minio_file_bucket, object_name=file_data.file_location
             )
+            if not file_data.download_url:
+                print(
+                    f'Failed to generate presigned URL for file {file_id}, '
+                    f'bucket: {self.settings.minio_file_bucket}, object: {file_data.file_location}'
+                )
+                raise HTTPException(status_code=500, detail='Failed to generate file access URL')
+
+            return ResponseModel(status=ResponseStatus.SUCCESS, data=file_data)
 
         except HTTPException:
             raise
         except Exception as e:
             print(e)
-            raise HTTPException(status_code=500, detail='Failed to fetch files for course.')
+            raise HTTPException(status_code=500, detail='Failed to fetch file')
 
-    def get_file_by_id(self, db: Session, file_id: str, cache: CacheService = None) -> ResponseModel[FileResponseSchema]:
-        try:
-            # Try to get from cache first
-            if cache:
-                cached_file = cache.get_file_cache(file_id)
-                if cached_file:
-                    # Still need to generate fresh presigned URL for cached files
-                    file_obj = File(**cached_file)
-                    file_data = FileResponseSchema.model_validate(file_obj)
-                    file_data.file_location
-                    return ResponseModel(
-                        status=ResponseStatus.SUCCESS,
-                        data=file_data,
-                    )
+    async def download_file(
+        self,
+        db: Session,
+        file_id: str,
+        request: Request,
+        client: httpx.AsyncClient,
+        cache: CacheService = None,
+        attachment: bool = False,
+    ) -> Response:
+        """Stream a file's content from storage through the backend"""
+        file = self.get_files_by_ids(db, [file_id], cache).data[0]
+        if file is None:
+            raise HTTPException(status_code=404, detail=f'File with id {file_id} not found')
+
+        url = self.minio_service.get_internal_url(
+            self.settings.minio_file_bucket, file.file_location
+        )
+        if not url:
+            raise HTTPException(status_code=500, detail='Failed to generate file access URL')
+        return await stream_object(client, url, request, file.filename, attachment)
+
+    async def download_course_archive(
+        self, db: Session, course_id: str, request: Request, client: httpx.AsyncClient
+    ) -> Response:
+        """
+        A ZIP of every file of a course, one folder per exam type.
+
+        The archive is stored under the digest of the course's file set, so it is built once per
+        upload or delete and later downloads stream the stored object (with Range support).
+        """
+        rows = db.execute(
+            select(File.file_id, File.filename, File.file_location, File.exam_type, File.timestamp)
+            .where(File.course_id == course_id)
+            .order_by(File.exam_type, File.timestamp)
+        ).all()
+        if not rows:
+            if not db.scalar(select(exists().where(Course.course_id == course_id))):
+                raise HTTPException(status_code=404, detail=f'Course with id {course_id} not found')
+            raise HTTPException(status_code=404, detail='This course has no files yet.')
 
-            file = db.query(File).filter(File.file_id == file_id).first()
-            if not file:
-                raise HTTPException(status_code=404, detail=f'File with id {file_id} not found')
+        bucket = self.settings.minio_file_bucket
+        digest = hashlib.sha1(
+            '\n'.join(sorted(f'{row.file_id}:{row.filename}' for row in rows)).encode()
+        ).hexdigest()[:16]
+        prefix = f'{self.ARCHIVE_PREFIX}/{course_id}/'
+        object_name = f'{prefix}{digest}.zip'
+        filename = f'{course_id}.zip'
 
-            # Generate a temporary presigned URL that expires
-            presigned_url = self.minio_service.get_presigned_url(
-                bucket_name=self.settings.minio_file_bucket,
-                object_name=file.file_location,
-                expires=3600,  # URL expires in 1 hour
+        try:
+            return await stream_object(
+                client,
+                self.minio_service.get_internal_url(bucket, object_name),
+                request,
+                filename,
+                attachment=True,
             )
-            
-            if not presigned_url:
-                print(f"Failed to generate presigned URL for file {file_id}, bucket: {self.settings.minio_file_bucket}, object: {file.file_location}")
-                raise HTTPException(status_code=500, detail='Failed to generate file access URL')
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+
+        urls = self.minio_service.get_internal_urls(bucket, [row.file_location for row in rows])
+        names = set()
+        entries = []
+        for row in rows:
+            safe_filename = row.filename.replace('/', '_').replace('\\', '_')
+            name = f'{row.exam_type}/{safe_filename}'
+            stem, ext = os.path.splitext(name)
+            copy = 1
+            while name in names:
+                copy += 1
+                name = f'{stem} ({copy}){ext}'
+            names.add(name)
+            entries.append(ArchiveEntry(name, urls[row.file_location], row.timestamp))
+
+        return StreamingResponse(
+            self._archive_chunks(client, entries, bucket, object_name, prefix),
+            media_type='application/zip',
+            headers={
+                'Content-Disposition': content_disposition(filename, attachment=True),
+                'Cache-Control': 'private, no-cache',
+            },
+        )
+
+    async def _archive_chunks(
+        self,
+        client: httpx.AsyncClient,
+        entries: List[ArchiveEntry],
+        bucket: str,
+        object_name: str,
+        prefix: str,
+    ):
+        # The copy goes to a temporary file, not memory, and is stored once the client has it all
+        spool = tempfile.TemporaryFile()
+        stream = ArchiveStream(client, entries, spool)
+        try:
+            async for chunk in stream:
+                yield chunk
+        except BaseException:
+            spool.close()
+            raise
+        if not stream.complete:
+            spool.close()
+            return
+
+        async def store():
+            try:
+                length = spool.tell()
+                spool.seek(0)
+                await asyncio.to_thread(
+                    self.minio_service.store_archive, bucket, object_name, spool, length, prefix
+                )
+            finally:
+                spool.close()
 
-            # Create a copy of the file data with the temporary URL
-            file_data = FileResponseSchema.model_validate(file)
+        task = asyncio.create_task(store())
+        archive_uploads.add(task)
+        task.add_done_callback(archive_uploads.discard)
 
-            # Cache the result (without the presigned URL)
+    def get_files_by_ids(
+        self, db: Session, file_ids: List[str], cache: CacheService = None
+    ) -> ResponseModel[List[Optional[FileResponseSchema]]]:
+        """Files in the order of `file_ids` (None where unknown), from one MGET and one IN query"""
+        try:
+            unique_ids = list(dict.fromkeys(file_ids))
+            files = {}
             if cache:
-                file_dict = {
-                    "file_id": file.file_id,
-                    "filename": file.filename,
-                    "file_location": file.file_location,  # Store original path, not presigned URL
-                    "user_id": str(file.user_id),
-                    "course_id": str(file.course_id) if file.course_id else None,
-                    "exam_type": file.exam_type,
-                    "info": file.info,
-                    "anonymous": file.anonymous,
-                    "timestamp": file.timestamp.isoformat() if file.timestamp else None
-                }
-                cache.set_file_cache(file_id, file_dict)
+                for file_id, cached in zip(unique_ids, cache.get_file_caches(unique_ids)):
+                    if cached:
+                        files[file_id] = FileResponseSchema.model_validate(cached)
+
+            missing = [file_id for file_id in unique_ids if file_id not in files]
+            if missing:
+                loaded = FILE_LIST.validate_python(
+                    _file_rows(db, select(*FILE_COLUMNS).where(File.file_id.in_(missing))),
+                    from_attributes=True,
+                )
+                if cache:
+                    cache.set_file_caches(
+                        {
+                            file.file_id: file.model_dump(mode='json', exclude={'uploader'})
+                            for file in loaded
+                        }
+                    )
+                files.update((file.file_id, file) for file in loaded)
 
-            return ResponseModel(status=ResponseStatus.SUCCESS, data=file_data)
+            return ResponseModel(
+                status=ResponseStatus.SUCCESS, data=[files.get(file_id) for file_id in file_ids]
+            )
 
         except Exception as e:
             print(e)
-            raise HTTPException(status_code=500, detail='Failed to fetch file')
-
-    def delete_file(self, db: Session, file_id: str, user_id: str, cache: CacheService = None) -> ResponseModel[None]:
+            raise HTTPException(status_code=500, detail='Failed to fetch files')
+
+    def delete_file(
+        self,
+        db: Session,
+        file_id: str,
+        user_id: str,
+        cache: CacheService = None,
+        events: EventBroker = None,
+    ) -> ResponseModel[None]:
         try:
             file = db.query(File).filter(File.file_id == file_id, File.user_id == user_id).first()
             if not file:
@@ -270,11 +526,17 @@ class FileCRUD:
 
             # Delete file record from database
             db.delete(file)
+            if file.course_id:
+                CourseCRUD.record_file_removed(db, file.course_id, ExamType(file.exam_type).value)
             db.commit()
 
             # Invalidate related caches
             if cache:
                 cache.invalidate_file_related_caches(file_id, str(user_id), str(file.course_id))
+                cache.remove_from_timelines(self._timeline_keys(user_id, file.course_id), file_id)
+
+            if events:
+                events.publish('file.deleted', {'file_id': file_id}, file.course_id)
 
             return ResponseModel(
                 status=ResponseStatus.SUCCESS,
@@ -288,48 +550,61 @@ class FileCRUD:
             print(e)
             raise HTTPException(status_code=500, detail='Failed to delete file.')
 
-    def get_recent_uploads(self, db: Session, limit: int = 20, cache: CacheService = None) -> ResponseModel[List[FileResponseSchema]]:
-        """Get the most recent file uploads sorted by timestamp."""
+    @staticmethod
+    def _timeline_keys(user_id: str, course_id: Optional[str]) -> List[str]:
+        keys = ['timeline:recent', f'timeline:user:{user_id}']
+        if course_id:
+            keys.append(f'timeline:course:{course_id}')
+        return keys
+
+    def _recent_files(
+        self, db: Session, key: str, condition, limit: int, cache: CacheService = None
+    ) -> List[FileRow]:
+        """
+        Newest files matching `condition`, served from the capped Redis timeline `key`.
+
+        Every limit up to TIMELINE_SIZE reads the same sorted set, which upload/delete keep
+        current; a missing timeline is rebuilt from one ORDER BY query.
+        """
+        query = select(*FILE_COLUMNS)
+        if condition is not None:
+            query = query.where(condition)
+
+        if not cache or limit > TIMELINE_SIZE:
+            return _file_rows(db, query.order_by(File.timestamp.desc()).limit(limit))
+
+        file_ids = cache.get_timeline(key, limit)
+        if file_ids is None:
+            generation = cache.generation(key)
+            files = _file_rows(db, query.order_by(File.timestamp.desc()).limit(TIMELINE_SIZE))
+            cache.load_timeline(
+                key, ((f.file_id, f.timestamp.timestamp()) for f in files), generation
+            )
+            return files[:limit]
+
+        if not file_ids:
+            return []
+        files = {
+            f.file_id: f
+            for f in _file_rows(db, select(*FILE_COLUMNS).where(File.file_id.in_(file_ids)))
+        }
+        return [files[file_id] for file_id in file_ids if file_id in files]
+
+    def get_recent_uploads(
+        self, db: Session, limit: int = 20, cache: CacheService = None, course_id: str = None
+    ) -> ResponseModel[List[FileResponseSchema]]:
+        """Get the most recent file uploads sorted by timestamp, optionally of one course."""
         try:
-            # Try to get from cache first
-            cache_key = f"recent_uploads_{limit}"
-            if cache:
-                cached_files = cache.get(cache_key)
-                if cached_files:
-                    return ResponseModel(
-                        status=ResponseStatus.SUCCESS,
-                        data=[FileResponseSchema.model_validate(File(**file_data)) for file_data in cached_files],
-                    )
+            if course_id:
+                files = self._recent_files(
+                    db, f'timeline:course:{course_id}', File.course_id == course_id, limit, cache
+                )
+            else:
+                files = self._recent_files(db, 'timeline:recent', None, limit, cache)
 
-            # Query files ordered by timestamp descending (most recent first)
-            files = (
-                db.query(File)
-                .order_by(File.timestamp.desc())
-                .limit(limit)
-                .all()
-            )
-            
-            # Cache the result
-            if cache:
-                files_data = []
-                for file in files:
-                    file_dict = {
-                        "file_id": file.file_id,
-                        "filename": file.filename,
-                        "file_location": file.file_location,
-                        "user_id": str(file.user_id),
-                        "course_id": str(file.course_id) if file.course_id else None,
-                        "exam_type": file.exam_type,
-                        "info": file.info,
-                        "anonymous": file.anonymous,
-                        "timestamp": file.timestamp.isoformat() if file.timestamp else None
-                    }
-                    files_data.append(file_dict)
-                cache.set(cache_key, files_data, expire=300)  # Cache for 5 minutes
-            
             return ResponseModel(
                 status=ResponseStatus.SUCCESS,
-                data=[FileResponseSchema.model_validate(file) for file in files],
+                data=FILE_LIST.validate_python(files, from_attributes=True),
             )
 
         except Exception as e:
@@ -339,53 +614,27 @@ class FileCRUD:
     def get_recent_uploads_by_user(self, db: Session, user_id: str, limit: int = 20, cache: CacheService = None) -> ResponseModel[List[FileResponseSchema]]:
         """Get the most recent file uploads for a specific user sorted by timestamp."""
         try:
-            # Try to get from cache first
-            cache_key = f"recent_uploads_user_{user_id}_{limit}"
-            if cache:
-                cached_files = cache.get(cache_key)
-                if cached_files:
-                    return ResponseModel(
-                        status=ResponseStatus.SUCCESS,
-                        data=[FileResponseSchema.model_validate(File(**file_data)) for file_data in cached_files],
-                    )
-
-            # Query files for specific user ordered by timestamp descending (most recent first)
-            files = (
-                db.query(File)
-                .filter(File.user_id == user_id)
-                .order_by(File.timestamp.desc())
-                .limit(limit)
-                .all()
+            files = self._recent_files(
+                db, f'timeline:user:{user_id}', File.user_id == user_id, limit, cache
             )
-            
-            # Cache the result
-            if cache:
-                files_data = []
-                for file in files:
-                    file_dict = {
-                        "file_id": file.file_id,
-                        "filename": file.filename,
-                        "file_location": file.file_location,
-                        "user_id": str(file.user_id),
-                        "course_id": str(file.course_id) if file.course_id else None,
-                        "exam_type": file.exam_type,
-                        "info": file.info,
-                        "anonymous": file.anonymous,
-                        "timestamp": file.timestamp.isoformat() if file.timestamp else None
-                    }
-                    files_data.append(file_dict)
-                cache.set(cache_key, files_data, expire=300)  # Cache for 5 minutes
-            
+
             return ResponseModel(
                 status=ResponseStatus.SUCCESS,
-                data=[FileResponseSchema.model_validate(file) for file in files],
+                data=FILE_LIST.validate_python(files, from_attributes=True),
             )
 
         except Exception as e:
             print(e)
             raise HTTPException(status_code=500, detail='Failed to fetch recent uploads for user.')
 
-    def admin_delete_file(self, db: Session, file_id: str, admin_user_id: str, cache: CacheService = None) -> ResponseModel[None]:
+    def admin_delete_file(
+        self,
+        db: Session,
+        file_id: str,
+        admin_user_id: str,
+        cache: CacheService = None,
+        events: EventBroker = None,
+    ) -> ResponseModel[None]:
         """Admin-only file deletion - only specific admin user can delete any file"""
         try:
             # Check if user is the specific admin
@@ -410,11 +659,19 @@ class FileCRUD:
 
             # Delete file record from database
             db.delete(file)
+            if file.course_id:
+                CourseCRUD.record_file_removed(db, file.course_id, ExamType(file.exam_type).value)
             db.commit()
 
             # Invalidate related caches
             if cache:
                 cache.invalidate_file_related_caches(file_id, str(file.user_id), str(file.course_id))
+                cache.remove_from_timelines(
+                    self._timeline_keys(file.user_id, file.course_id), file_id
+                )
+
+            if events:
+                events.publish('file.deleted', {'file_id': file_id}, file.course_id)
 
             return ResponseModel(
                 status=ResponseStatus.SUCCESS,
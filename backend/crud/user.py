@@ -1,24 +1,79 @@
+from typing import Dict, List, Optional
+
 from fastapi import HTTPException, UploadFile
 from pydantic import ValidationError
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from core.config import get_settings
 from models.user import User
 from schemas.common import ResponseModel, ResponseStatus
+from schemas.user import UploaderProfile
 from schemas.user import UserCreate as UserCreateSchema
 from schemas.user import UserResponse as UserResponseSchema
 from schemas.user import UserUpdate as UserUpdateSchema
-from services.auth import JWTService
+from services.cache import CacheService, TTLCache
 from services.minio import MinioService
 
 settings = get_settings()
 
+# user_id -> UserResponseSchema, so hot paths can confirm a user without a query
+user_profiles = TTLCache(maxsize=10000, ttl=30)
+
+
+def avatar_url(avatar: Optional[str]) -> Optional[str]:
+    """Public URL of a stored avatar: Google avatars are full URLs, uploaded ones object paths"""
+    if not avatar or avatar.startswith('https'):
+        return avatar
+    return f'{settings.minio_public_endpoint}{avatar}'
+
 
 class UserCRUD:
     def __init__(self):
-        self.jwt_service = JWTService()
         self.minio_service = MinioService()
 
+    @staticmethod
+    def get_cached_profile(db: Session, user_id: str) -> UserResponseSchema | None:
+        """Profile of `user_id` from the short-lived cache, or the database; None if unknown"""
+        profile = user_profiles.get(user_id)
+        if profile is None:
+            user = db.query(User).filter(User.user_id == user_id).first()
+            if not user:
+                return None
+            profile = UserResponseSchema.model_validate(user)
+            user_profiles.set(user_id, profile)
+        return profile
+
+    @staticmethod
+    def get_uploader_profiles(
+        db: Session, user_ids: List[str], cache: CacheService = None
+    ) -> Dict[str, UploaderProfile]:
+        """Profiles of many users: one MGET, then one IN query for the uncached ones"""
+        user_ids = list(dict.fromkeys(user_ids))
+        profiles = {}
+        if cache:
+            for user_id, cached in zip(user_ids, cache.get_uploader_profiles(user_ids)):
+                if cached is not None:
+                    profiles[user_id] = UploaderProfile.model_validate(cached)
+        missing = [user_id for user_id in user_ids if user_id not in profiles]
+        if missing:
+            loaded = {
+                row.user_id: UploaderProfile(
+                    user_id=row.user_id, username=row.username, avatar=avatar_url(row.avatar)
+                )
+                for row in db.execute(
+                    select(User.user_id, User.username, User.avatar).where(
+                        User.user_id.in_(missing)
+                    )
+                )
+            }
+            if cache:
+                cache.set_uploader_profiles(
+                    {user_id: profile.model_dump() for user_id, profile in loaded.items()}
+                )
+            profiles.update(loaded)
+        return profiles
+
     def get_or_create_user(
         self,
         db: Session,
@@ -64,25 +119,21 @@ class UserCRUD:
             db.rollback()
             raise HTTPException(status_code=400, detail=f'Failed to get or create user: {str(e)}')
 
-    def get_user_profile(self, db: Session, token: str) -> ResponseModel[UserResponseSchema]:
+    def get_user_profile(self, db: Session, user_id: str) -> ResponseModel[UserResponseSchema]:
         try:
-            user_id = self.jwt_service.verify_token(token)['user_id']
-            user = db.query(User).filter(User.user_id == user_id).first()
-            if not user:
+            profile = self.get_cached_profile(db, user_id)
+            if not profile:
                 raise HTTPException(status_code=404, detail='User not found.')
 
-            return ResponseModel(
-                status=ResponseStatus.SUCCESS, data=UserResponseSchema.model_validate(user)
-            )
+            return ResponseModel(status=ResponseStatus.SUCCESS, data=profile)
         except Exception as e:
             print(e)
             raise HTTPException(status_code=400, detail='Failed to get user profile.')
 
     def update_user_profile(
-        self, db: Session, token: str, update_data: UserUpdateSchema
+        self, db: Session, user_id: str, update_data: UserUpdateSchema, cache: CacheService = None
     ) -> ResponseModel[UserResponseSchema]:
         with db.begin():
-            user_id = self.jwt_service.verify_token(token)['user_id']
             user = db.query(User).filter(User.user_id == user_id).first()
             if not user:
                 raise HTTPException(status_code=404, detail='User not found')
@@ -94,15 +145,19 @@ class UserCRUD:
 
             if user.username and user.email and user.department:
                 user.is_profile_completed = True
-
-            return ResponseModel(
+            response = ResponseModel(
                 status=ResponseStatus.SUCCESS, data=UserResponseSchema.model_validate(user)
             )
 
+        # Only once committed, or a concurrent read could cache the old profile again
+        user_profiles.delete(user_id)
+        if cache:
+            cache.invalidate_uploader_profile(user_id)
+        return response
+
     async def upload_avatar(
-        self, db: Session, token: str, upload_file: UploadFile
+        self, db: Session, user_id: str, upload_file: UploadFile, cache: CacheService = None
     ) -> ResponseModel[UserResponseSchema]:
-        user_id = self.jwt_service.verify_token(token)['user_id']
         user = db.query(User).filter(User.user_id == user_id).first()
         if not user:
             raise HTTPException(status_code=404, detail='User not found')
@@ -121,15 +176,14 @@ class UserCRUD:
         except Exception as e:
             raise HTTPException(status_code=400, detail=f'Failed to upload avatar: {str(e)}')
 
+        user_profiles.delete(user_id)
+        if cache:
+            cache.invalidate_uploader_profile(user_id)
+
         return ResponseModel(status=ResponseStatus.SUCCESS, message='Avatar uploaded successfully')
 
-    async def get_avatar(self, db: Session, token: str) -> ResponseModel[UserResponseSchema]:
-        user_id = self.jwt_service.verify_token(token)['user_id']
-        user = db.query(User).filter(User.user_id == user_id).first()
-        if not user:
+    async def get_avatar(self, db: Session, user_id: str) -> ResponseModel[UserResponseSchema]:
+        profile = self.get_cached_profile(db, user_id)
+        if not profile:
             raise HTTPException(status_code=404, detail='User not found')
-        if user.avatar.startswith('https'):  # if avatar is a googleusercontent url
-            return ResponseModel(status=ResponseStatus.SUCCESS, data=user.avatar)
-        return ResponseModel(
-            status=ResponseStatus.SUCCESS, data=f'{settings.minio_public_endpoint}{user.avatar}'
-        )
+        return ResponseModel(status=ResponseStatus.SUCCESS, data=avatar_url(profile.avatar))
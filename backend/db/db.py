@@ -1,13 +1,22 @@
 from typing import Generator
 
-from sqlalchemy import URL, create_engine, text
+from sqlalchemy import URL, bindparam, create_engine, text
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from core.config import get_settings
 from models.comment import Comment
-from models.course import Course
+from models.course import (
+    COURSE_SEARCH_VECTOR,
+    Course,
+    CourseStat,
+    Instructor,
+    Tag,
+    course_instructors,
+    course_tags,
+)
 from models.file import File
 from models.user import User, user_bookmarks
+from utils.course import index_tokens, sync_course_relations
 
 Base = declarative_base()
 
@@ -45,6 +54,107 @@ def init_db() -> None:
             File.__table__, 
             Comment.__table__, 
             Course.__table__,
-            user_bookmarks
+            user_bookmarks,
+            Instructor.__table__,
+            Tag.__table__,
+            course_instructors,
+            course_tags,
+            CourseStat.__table__,
         ]
     )
+
+    # create_all skips tables that already exist, so bring older databases up to date
+    with engine.connect() as conn:
+        _migrate_courses(conn)
+        _backfill_course_name_tokens(conn)
+        _migrate_files(conn)
+        _migrate_comments(conn)
+        conn.commit()
+
+    # Databases imported before the instructor/tag tables existed
+    with engine.connect() as conn:
+        unlinked = conn.execute(
+            text(
+                'SELECT EXISTS (SELECT 1 FROM courses) '
+                'AND NOT EXISTS (SELECT 1 FROM course_instructors)'
+            )
+        ).scalar()
+        if unlinked:
+            sync_course_relations(conn)
+            conn.commit()
+        _backfill_course_stats(conn)
+        conn.commit()
+
+
+def _migrate_courses(conn) -> None:
+    conn.execute(
+        text(
+            'ALTER TABLE courses ADD COLUMN IF NOT EXISTS search_vector tsvector '
+            f'GENERATED ALWAYS AS ({COURSE_SEARCH_VECTOR}) STORED'
+        )
+    )
+    conn.execute(
+        text(
+            'CREATE INDEX IF NOT EXISTS ix_courses_search_vector '
+            'ON courses USING gin (search_vector)'
+        )
+    )
+    conn.execute(
+        text(
+            'CREATE INDEX IF NOT EXISTS ix_courses_course_name_trgm '
+            'ON courses USING gin ("courseName" gin_trgm_ops)'
+        )
+    )
+    conn.execute(text('ALTER TABLE courses ADD COLUMN IF NOT EXISTS name_tokens text[]'))
+    conn.execute(
+        text(
+            'CREATE INDEX IF NOT EXISTS ix_courses_name_tokens '
+            'ON courses USING gin (name_tokens)'
+        )
+    )
+
+
+def _migrate_files(conn) -> None:
+    conn.execute(text('CREATE INDEX IF NOT EXISTS ix_files_course_id ON files (course_id)'))
+
+
+def _migrate_comments(conn) -> None:
+    conn.execute(
+        text(
+            'ALTER TABLE "Comments" ADD COLUMN IF NOT EXISTS file_id VARCHAR(255) '
+            'REFERENCES files (file_id) ON DELETE CASCADE'
+        )
+    )
+    conn.execute(
+        text(
+            'CREATE INDEX IF NOT EXISTS ix_comments_file_id_comment_time '
+            'ON "Comments" (file_id, comment_time)'
+        )
+    )
+
+
+def _backfill_course_stats(conn) -> None:
+    # Only for databases that had files before course_stats existed; afterwards the file write
+    # paths keep it current
+    conn.execute(
+        text(
+            'INSERT INTO course_stats (course_id, exam_type, file_count, latest_upload) '
+            'SELECT course_id, exam_type, count(*), max(timestamp) FROM files '
+            'WHERE course_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM course_stats) '
+            'GROUP BY course_id, exam_type'
+        )
+    )
+
+
+def _backfill_course_name_tokens(conn) -> None:
+    rows = conn.execute(
+        text('SELECT course_id, "courseName" FROM courses WHERE name_tokens IS NULL')
+    ).all()
+    if not rows:
+        return
+    conn.execute(
+        text('UPDATE courses SET name_tokens = :tokens WHERE course_id = :course_id').bindparams(
+            bindparam('tokens', type_=Course.__table__.c.name_tokens.type)
+        ),
+        [{'course_id': course_id, 'tokens': index_tokens(name)} for course_id, name in rows],
+    )
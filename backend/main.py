@@ -4,11 +4,19 @@ from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from core.config import get_settings
-from db.db import init_db
+from core.dependencies import (
+    get_course_catalog,
+    get_event_broker,
+    get_http_client,
+    get_storage_client,
+)
+from db.db import SessionLocal, init_db
 from routers.comment import router as comment_router
 from routers.course import router as course_router
+from routers.event import router as event_router
 from routers.file import router as file_router
 from routers.user import router as user_router
 from routers.bookmark import router as bookmark_router
@@ -19,11 +27,21 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    with SessionLocal() as db:
+        get_course_catalog().refresh_if_stale(db)
+    await get_event_broker().start()
     yield
+    await get_event_broker().stop()
+    await get_http_client().aclose()
+    await get_storage_client().aclose()
 
 
 app = FastAPI(
-    lifespan=lifespan, docs_url='/api/docs', redoc_url='/api/redoc', openapi_url='/api/openapi.json'
+    lifespan=lifespan,
+    docs_url='/api/docs',
+    redoc_url='/api/redoc',
+    openapi_url='/api/openapi.json',
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -39,6 +57,7 @@ app.include_router(file_router)
 app.include_router(comment_router)
 app.include_router(course_router)
 app.include_router(bookmark_router)
+app.include_router(event_router)
 
 if __name__ == '__main__':
     uvicorn.run(
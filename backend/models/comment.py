@@ -1,27 +1,37 @@
 from datetime import datetime
+from typing import Optional
 
-from sqlalchemy.orm import Mapped
+from sqlalchemy import ForeignKey, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base, BaseModel
 
 
 class Comment(Base):
     __tablename__ = 'Comments'
+    # Thread reads are one range scan: a file's comments in time order
+    __table_args__ = (Index('ix_comments_file_id_comment_time', 'file_id', 'comment_time'),)
 
     comment_id: Mapped[BaseModel.int_primary_key]
     commenter_id: Mapped[BaseModel.str_base]
     content: Mapped[BaseModel.str_base]
     comment_time: Mapped[BaseModel.timestamp]
+    # Comments created before threads existed have no file
+    file_id: Mapped[Optional[str]] = mapped_column(
+        String(255), ForeignKey('files.file_id', ondelete='CASCADE'), nullable=True
+    )
 
-    def __init__(self, commenter_id: str, content: str):
+    def __init__(self, commenter_id: str, content: str, file_id: str | None = None):
         # empty str validation exception is in CommentCRUD's create
         self.commenter_id = commenter_id
         self.content = content
+        self.file_id = file_id
         self.comment_time = datetime.now()
 
     def __repr__(self):
         return (
             f'Comment(commenter_id={self.commenter_id}, '
             f'comment={self.content}, '
+            f'file_id={self.file_id}, '
             f'comment_time={self.comment_time})'
         )
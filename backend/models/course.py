@@ -1,4 +1,7 @@
-from sqlalchemy import String
+from datetime import datetime
+
+from sqlalchemy import Column, Computed, ForeignKey, Index, Integer, String, Table, Text
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import TYPE_CHECKING
 
@@ -7,8 +10,89 @@ from .base import Base
 if TYPE_CHECKING:
     from .file import File
 
+# Weighted search document for `search_text`. The 'simple' config keeps tokens verbatim, which is
+# what we want for course codes and for CJK text (no stemming, no stop words).
+COURSE_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(\"courseName\", '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(\"departmentId\", '') || ' ' || "
+    "coalesce(\"serialNumber\", '') || ' ' || course_id), 'A') || "
+    "setweight(to_tsvector('simple', replace(coalesce(instructors, ''), ',', ' ')), 'B') || "
+    "setweight(to_tsvector('simple', replace(coalesce(tags, ''), ',', ' ')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(\"courseNote\", '')), 'C')"
+)
+
+
+# Normalized copies of the comma-joined Course.instructors / Course.tags strings, rebuilt by
+# utils.course.sync_course_relations whenever courses are imported
+course_instructors = Table(
+    'course_instructors',
+    Base.metadata,
+    Column(
+        'course_id',
+        String(50),
+        ForeignKey('courses.course_id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column(
+        'instructor_id',
+        Integer,
+        ForeignKey('instructors.instructor_id', ondelete='CASCADE'),
+        primary_key=True,
+        index=True,
+    ),
+)
+
+course_tags = Table(
+    'course_tags',
+    Base.metadata,
+    Column(
+        'course_id',
+        String(50),
+        ForeignKey('courses.course_id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column(
+        'tag_id',
+        Integer,
+        ForeignKey('tags.tag_id', ondelete='CASCADE'),
+        primary_key=True,
+        index=True,
+    ),
+)
+
+
+class Instructor(Base):
+    __tablename__ = 'instructors'
+
+    instructor_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(100), unique=True)
+
+    def __repr__(self):
+        return f'Instructor(name={self.name})'
+
+
+class Tag(Base):
+    __tablename__ = 'tags'
+
+    tag_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(100), unique=True)
+
+    def __repr__(self):
+        return f'Tag(name={self.name})'
+
+
 class Course(Base):
     __tablename__ = 'courses'
+    __table_args__ = (
+        Index('ix_courses_search_vector', 'search_vector', postgresql_using='gin'),
+        Index(
+            'ix_courses_course_name_trgm',
+            'courseName',
+            postgresql_using='gin',
+            postgresql_ops={'courseName': 'gin_trgm_ops'},
+        ),
+        Index('ix_courses_name_tokens', 'name_tokens', postgresql_using='gin'),
+    )
 
     semester: Mapped[str] = mapped_column(String(50))
     departmentId: Mapped[str] = mapped_column(String(50))
@@ -25,6 +109,14 @@ class Course(Base):
     instructors: Mapped[str] = mapped_column(String(200))
     course_id: Mapped[str] = mapped_column(String(50), primary_key=True)
 
+    # utils.course.index_tokens(courseName), written by the crawler and backfilled by init_db
+    name_tokens: Mapped[list[str]] = mapped_column(ARRAY(Text), nullable=True, deferred=True)
+
+    # Generated by Postgres, never written by the application or the crawler
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, Computed(COURSE_SEARCH_VECTOR, persisted=True), deferred=True
+    )
+
     files: Mapped[list['File']] = relationship(
         'File',  # type: ignore
         back_populates='course',
@@ -34,3 +126,22 @@ class Course(Base):
 
     def __repr__(self):
         return f'Course(course_id={self.course_id}, courseName={self.courseName})'
+
+
+class CourseStat(Base):
+    """Per course and exam type file counts, kept up to date by FileCRUD's write paths."""
+
+    __tablename__ = 'course_stats'
+
+    course_id: Mapped[str] = mapped_column(
+        String(50), ForeignKey('courses.course_id', ondelete='CASCADE'), primary_key=True
+    )
+    exam_type: Mapped[str] = mapped_column(String(50), primary_key=True)
+    file_count: Mapped[int] = mapped_column(Integer, default=0)
+    latest_upload: Mapped[datetime] = mapped_column(nullable=True)
+
+    def __repr__(self):
+        return (
+            f'CourseStat(course_id={self.course_id}, exam_type={self.exam_type}, '
+            f'file_count={self.file_count})'
+        )
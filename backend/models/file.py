@@ -36,7 +36,9 @@ class File(Base):
     anonymous: Mapped[bool] = mapped_column(Boolean, default=False)
 
     user_id: Mapped[str] = mapped_column(String(255), ForeignKey('users.user_id'), nullable=False)
-    course_id: Mapped[str] = mapped_column(String(50), ForeignKey('courses.course_id'), nullable=True)
+    course_id: Mapped[str] = mapped_column(
+        String(50), ForeignKey('courses.course_id'), nullable=True, index=True
+    )
 
     uploader: Mapped['User'] = relationship(
         'User',  # type: ignore
@@ -1,13 +1,14 @@
-from typing import List
+from typing import Dict, List
 
-from fastapi import APIRouter, Cookie, Depends, Header
+from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
+from core.dependencies import get_cache, get_current_user
 from crud.bookmark import BookmarkCRUD
 from db.db import get_db
+from schemas.bookmark import BookmarkStatusRequest
 from schemas.common import ResponseModel
 from schemas.file import FileResponse as FileResponseSchema
-from core.dependencies import get_cache
 from services.cache import CacheService
 
 router = APIRouter(tags=['bookmark'], prefix='/api/v1/bookmark')
@@ -15,44 +16,55 @@ router = APIRouter(tags=['bookmark'], prefix='/api/v1/bookmark')
 bookmark_crud = BookmarkCRUD()
 
 
+@router.post('/status', response_model=ResponseModel[Dict[str, bool]])
+async def check_bookmark_statuses(
+    request: BookmarkStatusRequest,
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+):
+    """Check which of up to 200 files are bookmarked by the current user"""
+    return bookmark_crud.check_bookmark_statuses(db, user['user_id'], request.file_ids, cache)
+
+
 @router.post('/{file_id}', response_model=ResponseModel[None])
 async def add_bookmark(
     file_id: str,
-    token: str | None = Cookie(default=None),
+    user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db),
     cache: CacheService = Depends(get_cache),
 ):
     """Add a file to user's bookmarks"""
-    return bookmark_crud.add_bookmark(db, token, file_id, cache)
+    return bookmark_crud.add_bookmark(db, user['user_id'], file_id, cache)
 
 
 @router.delete('/{file_id}', response_model=ResponseModel[None])
 async def remove_bookmark(
     file_id: str,
-    token: str | None = Cookie(default=None),
+    user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db),
     cache: CacheService = Depends(get_cache),
 ):
     """Remove a file from user's bookmarks"""
-    return bookmark_crud.remove_bookmark(db, token, file_id, cache)
+    return bookmark_crud.remove_bookmark(db, user['user_id'], file_id, cache)
 
 
 @router.get('', response_model=ResponseModel[List[FileResponseSchema]])
 async def get_bookmarks(
-    token: str | None = Cookie(default=None),
+    user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db),
     cache: CacheService = Depends(get_cache),
 ):
     """Get all bookmarked files for the current user"""
-    return bookmark_crud.get_bookmarks(db, token, cache)
+    return bookmark_crud.get_bookmarks(db, user['user_id'], cache)
 
 
 @router.get('/{file_id}/status', response_model=ResponseModel[dict])
 async def check_bookmark_status(
     file_id: str,
-    token: str | None = Cookie(default=None),
+    user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db),
     cache: CacheService = Depends(get_cache),
 ):
     """Check if a file is bookmarked by the current user"""
-    return bookmark_crud.check_bookmark_status(db, token, file_id, cache) 
\ No newline at end of file
+    return bookmark_crud.check_bookmark_status(db, user['user_id'], file_id, cache) 
\ No newline at end of file
@@ -1,13 +1,17 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.orm import Session
 
+from core.dependencies import get_cache, get_event_broker
 from crud.comment import CommentCRUD
 from db.db import get_db
 from schemas.comment.main import CommentCreate, CommentResponse
 from schemas.common import CommentResponseModel
-from utils.comment import error_response
+from services.cache import CacheService
+from services.events import EventBroker
+from utils.comment import comment_response, error_response
 
 router = APIRouter(tags=['comment'], prefix='/api/v1/comment')
 
@@ -18,17 +22,17 @@ router = APIRouter(tags=['comment'], prefix='/api/v1/comment')
     status_code=status.HTTP_201_CREATED,
     response_description='Create a new comment',
 )
-async def create_comment(comment: CommentCreate, db: Session = Depends(get_db)):
+async def create_comment(
+    comment: CommentCreate,
+    db: Session = Depends(get_db),
+    events: EventBroker = Depends(get_event_broker),
+    cache: CacheService = Depends(get_cache),
+):
     # TODO: restrict characters of commenter_id
     try:
-        db_comment = CommentCRUD.create_comment(comment, db)
-
-        data = CommentResponse(
-            commenter_id=db_comment.commenter_id,
-            comment_time=db_comment.comment_time.isoformat(),
-            content=db_comment.content,
-            comment_id=db_comment.comment_id,
-        )
+        db_comment = CommentCRUD.create_comment(comment, db, events, cache)
+
+        data = comment_response(db_comment)
         return CommentResponseModel(status='success', message=None, data=data)
 
     except Exception as e:
@@ -38,19 +42,16 @@ async def create_comment(comment: CommentCreate, db: Session = Depends(get_db)):
 @router.get(
     '', response_model=CommentResponseModel[List[CommentResponse]], status_code=status.HTTP_200_OK
 )
-async def read_all_comment(db: Session = Depends(get_db)):
+async def read_all_comment(
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=10, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """Latest comments first"""
     try:
-        comments = CommentCRUD.read_all_comment(db)
+        comments = CommentCRUD.read_all_comment(db, skip, limit)
         if comments:
-            data = [
-                CommentResponse(
-                    commenter_id=comment.commenter_id,
-                    comment_time=comment.comment_time.isoformat(),
-                    content=comment.content,
-                    comment_id=comment.comment_id,
-                )
-                for comment in comments
-            ]
+            data = [comment_response(comment) for comment in comments]
             return CommentResponseModel(status='success', message=None, data=data)
         else:
             raise Exception('No comments found')
@@ -60,29 +61,73 @@ async def read_all_comment(db: Session = Depends(get_db)):
         return error_response(e=e, status_code=status.HTTP_404_NOT_FOUND)
 
 
+@router.get(
+    '/counts', response_model=CommentResponseModel[Dict[str, int]], status_code=status.HTTP_200_OK
+)
+async def read_comment_counts(
+    file_ids: List[str] = Query(..., max_length=200),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+):
+    """Comment counts of up to 200 files, for file listings"""
+    try:
+        counts = CommentCRUD.get_comment_counts(file_ids, db, cache)
+        return CommentResponseModel(status='success', message=None, data=counts)
+
+    except Exception as e:
+        return error_response(e=e, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@router.get(
+    '/file/{file_id}',
+    response_model=CommentResponseModel[List[CommentResponse]],
+    status_code=status.HTTP_200_OK,
+)
+async def read_thread(
+    file_id: str,
+    limit: int = Query(default=20, ge=1, le=100),
+    after_time: Optional[datetime] = Query(
+        default=None, description='comment_time of the last comment of the previous page'
+    ),
+    after_id: int = Query(
+        default=0, description='comment_id of the last comment of the previous page'
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Retrieve the comment thread of a file
+
+    Returns comments in ascending order of comment time, one page at a time
+    """
+    try:
+        comments = CommentCRUD.read_thread(file_id, db, limit, after_time, after_id)
+        data = [comment_response(comment) for comment in comments]
+        return CommentResponseModel(status='success', message=None, data=data)
+
+    except Exception as e:
+        return error_response(e=e, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @router.get(
     '/{commenter_id}',
     response_model=CommentResponseModel[List[CommentResponse]],
     status_code=status.HTTP_200_OK,
 )
-async def read_comment_by_commenter(commenter_id: str, db: Session = Depends(get_db)):
+async def read_comment_by_commenter(
+    commenter_id: str,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
     """
     Retrieve comments by commenter ID
 
     Returns comments in descending order of comment time
     """
     try:
-        comments = CommentCRUD.read_comment_by_commenter(commenter_id, db)
+        comments = CommentCRUD.read_comment_by_commenter(commenter_id, db, skip, limit)
         if comments:
-            data = [
-                CommentResponse(
-                    commenter_id=comment.commenter_id,
-                    comment_time=comment.comment_time.isoformat(),
-                    content=comment.content,
-                    comment_id=comment.comment_id,
-                )
-                for comment in comments
-            ]
+            data = [comment_response(comment) for comment in comments]
             return CommentResponseModel(status='success', message=None, data=data)
         else:
             raise Exception(f'No comments of {commenter_id} found')
@@ -97,17 +142,18 @@ async def read_comment_by_commenter(commenter_id: str, db: Session = Depends(get
     response_model=CommentResponseModel[CommentResponse],
     status_code=status.HTTP_200_OK,
 )
-async def delete_comment_by_id(comment_id: int, current_user: str, db: Session = Depends(get_db)):
+async def delete_comment_by_id(
+    comment_id: int,
+    current_user: str,
+    db: Session = Depends(get_db),
+    events: EventBroker = Depends(get_event_broker),
+    cache: CacheService = Depends(get_cache),
+):
     # TODO: validate commenter_id to determine deleting or not
     try:
-        comment = CommentCRUD.delete_comment_by_id(comment_id, current_user, db)
+        comment = CommentCRUD.delete_comment_by_id(comment_id, current_user, db, events, cache)
         if comment:
-            data = CommentResponse(
-                commenter_id=comment.commenter_id,
-                comment_time=comment.comment_time.isoformat(),
-                content=comment.content,
-                comment_id=comment.comment_id,
-            )
+            data = comment_response(comment)
             return CommentResponseModel(status='success', message=None, data=data)
         # database exception or no-id exception
 
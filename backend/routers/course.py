@@ -1,23 +1,46 @@
-from typing import List
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
 
+from core.dependencies import get_cache, get_course_catalog, get_optional_user, get_suggest_index
 from crud.course import CourseCRUD
+from crud.course_detail import CourseDetailCRUD
 from db.db import get_db
 from schemas.common import ResponseModel
-from schemas.course import CourseResponse, CourseSearchParams
+from schemas.course import (
+    CourseDetailResponse,
+    CourseResponse,
+    CourseSearchParams,
+    CourseStatsResponse,
+    CourseSuggestion,
+)
+from services.cache import CacheService
+from services.catalog import CourseCatalog
+from services.minio import MinioService
+from services.suggest import SuggestIndex
+from utils.http_cache import CacheValidator
+from utils.response import ModelResponse
 
 router = APIRouter(tags=['course'], prefix='/api/v1/course')
 course_crud = CourseCRUD()
+course_detail_crud = CourseDetailCRUD()
+
+
+def _catalog_versions(db: Session, catalog: CourseCatalog):
+    # Course data only changes with a catalog import, so the snapshot fingerprint is the version
+    version = catalog.version(db)
+    return None if version is None else [version]
 
 
 @router.get('/search', response_model=ResponseModel[List[CourseResponse]])
 async def search_courses(
+    request: Request,
     search_params: CourseSearchParams = Depends(),
     offset: int = Query(default=0, ge=0),
     limit: int = Query(default=10, ge=1, le=10),
     db: Session = Depends(get_db),
+    catalog: CourseCatalog = Depends(get_course_catalog),
 ):
     """
     Search courses with various filters and full-text search capability.
@@ -25,15 +48,101 @@ async def search_courses(
     Parameters:
     - All fields from CourseSearchParams are optional and can be used as filters
     - search_text: Optional full-text search across course name, note, tags, instructors, etc.
+      Results are ranked by relevance.
     - offset: Number of records to skip (for pagination)
     - limit: Maximum number of records to return (for pagination)
     """
-    return course_crud.search_courses(db, search_params, offset, limit)
+    validator = CacheValidator(request, _catalog_versions(db, catalog))
+    validator.check()
+    return validator.apply(
+        ModelResponse(course_crud.search_courses(db, search_params, offset, limit, catalog))
+    )
+
+
+@router.get('/suggest', response_model=ResponseModel[List[CourseSuggestion]])
+async def suggest_courses(
+    request: Request,
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=20),
+    db: Session = Depends(get_db),
+    catalog: CourseCatalog = Depends(get_course_catalog),
+    suggest_index: SuggestIndex = Depends(get_suggest_index),
+):
+    """
+    Course name autocomplete.
+
+    Matches course names by prefix first, then by any substring, and course ids by prefix.
+    """
+    validator = CacheValidator(request, _catalog_versions(db, catalog))
+    validator.check()
+    suggest_index.ensure(catalog)
+    return validator.apply(
+        ModelResponse(ResponseModel(status='success', data=suggest_index.suggest(q, limit)))
+    )
+
+
+@router.get('/stats', response_model=ResponseModel[List[CourseStatsResponse]])
+async def get_course_stats(
+    request: Request,
+    course_ids: List[str] = Query(min_length=1, max_length=100),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+):
+    """
+    File counts per exam type and latest upload time for up to 100 courses.
+
+    Pass `course_ids` once per course, e.g. `?course_ids=A1101&course_ids=A1102`.
+    """
+    validator = CacheValidator(
+        request, cache.get_versions([f'course:{course_id}' for course_id in course_ids])
+    )
+    validator.check()
+    return validator.apply(ModelResponse(course_crud.get_course_stats(db, course_ids)))
 
 
 @router.get('/{course_id}', response_model=ResponseModel[CourseResponse])
-async def get_course(course_id: str, db: Session = Depends(get_db)):
+async def get_course(
+    course_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    catalog: CourseCatalog = Depends(get_course_catalog),
+):
     """
     Get a specific course by its ID.
     """
-    return course_crud.get_course_by_id(db, course_id)
+    validator = CacheValidator(request, _catalog_versions(db, catalog))
+    validator.check()
+    return validator.apply(ModelResponse(course_crud.get_course_by_id(db, course_id, catalog)))
+
+
+@router.get('/{course_id}/detail', response_model=ResponseModel[CourseDetailResponse])
+async def get_course_detail(
+    course_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    catalog: CourseCatalog = Depends(get_course_catalog),
+    user: Optional[Dict] = Depends(get_optional_user),
+):
+    """
+    A course page in one request: the course, its files with their uploaders (hidden for
+    anonymous uploads), the caller's bookmark status of each file and the course stats.
+
+    Works without a token; `is_bookmarked` is then always false.
+    """
+    user_id = user['user_id'] if user else None
+    catalog_versions = _catalog_versions(db, catalog)
+    scopes = [f'course:{course_id}', 'profiles'] + ([f'user:{user_id}'] if user_id else [])
+    versions = cache.get_versions(scopes)
+    window = MinioService.download_window()
+    if versions is not None and window is not None:
+        versions.append((window, float(window)))
+    validator = CacheValidator(
+        request,
+        None if catalog_versions is None or versions is None else catalog_versions + versions,
+        private=user_id is not None,
+    )
+    validator.check()
+    return validator.apply(
+        ModelResponse(course_detail_crud.get_course_detail(db, course_id, user_id, catalog, cache))
+    )
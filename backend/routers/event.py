@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from core.dependencies import get_event_broker
+from services.events import EventBroker
+
+router = APIRouter(tags=['event'], prefix='/api/v1/events')
+
+
+@router.get('/stream')
+async def stream_events(
+    course_id: Optional[str] = Query(default=None, description='Only events of this course'),
+    events: EventBroker = Depends(get_event_broker),
+):
+    """
+    Server-sent events for new uploads, deletions and comments.
+
+    Event types are `file.created`, `file.deleted`, `comment.created` and `comment.deleted`.
+    Idle streams receive a heartbeat comment; a client that falls behind is disconnected and
+    should refetch `/api/v1/file/recent` after reconnecting.
+    """
+    events.check_capacity()
+    return StreamingResponse(
+        events.stream(course_id),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
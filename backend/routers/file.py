@@ -1,45 +1,175 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Cookie, Depends, File, Form, UploadFile, Query
+import httpx
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Query, Request
 from sqlalchemy.orm import Session
 
+from crud.feed import FeedCRUD
 from crud.file import FileCRUD
 from db.db import get_db
-from schemas.common import ResponseModel
+from schemas.common import ResponseModel, ResponseStatus
+from schemas.file import FileBatchGet
 from schemas.file import FileCreate as FileCreateSchema
 from schemas.file import FileResponse as FileResponseSchema
-from services.auth import JWTService
 from models.file import ExamType
-from core.dependencies import get_cache
+from core.dependencies import (
+    get_cache,
+    get_course_catalog,
+    get_current_user,
+    get_event_broker,
+    get_storage_client,
+)
 from services.cache import CacheService
+from services.catalog import CourseCatalog
+from services.events import EventBroker
+from services.minio import signing_stats
+from utils.http_cache import CacheValidator
+from utils.response import ModelResponse
 
 router = APIRouter(tags=['file'], prefix='/api/v1/file')
 
 file_crud = FileCRUD()
-jwt_service = JWTService()
+
+
+def embed_uploader_query(
+    embed_uploader: bool = Query(
+        default=False, description="Include uploader profiles (never for anonymous files)"
+    ),
+) -> bool:
+    return embed_uploader
+
+
+def _versions(cache: CacheService, scopes: List[str], embed_uploader: bool = False):
+    # Embedded profiles change with profile edits, which bump the "profiles" version
+    versions = cache.get_versions(scopes + ['profiles'] if embed_uploader else scopes)
+    # Download links are re-signed every window, so a revalidated copy never holds an expired one
+    window = file_crud.minio_service.download_window()
+    if versions is not None and window is not None:
+        versions.append((window, float(window)))
+    return versions
+
+
+def _listing(db: Session, response: ResponseModel, embed_uploader: bool, cache: CacheService):
+    if embed_uploader:
+        response = file_crud.embed_uploaders(db, response, cache)
+    return ModelResponse(file_crud.with_download_urls(response))
 
 
 @router.get('/recent', response_model=ResponseModel[List[FileResponseSchema]])
 async def get_recent_uploads(
+    request: Request,
     limit: int = Query(default=20, ge=1, le=100, description="Number of recent files to retrieve (1-100)"),
-    db: Session = Depends(get_db)
+    course_id: Optional[str] = Query(default=None, description="Only uploads of this course"),
+    embed_uploader: bool = Depends(embed_uploader_query),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+):
+    """Get the most recent file uploads across all users, or of one course."""
+    validator = CacheValidator(
+        request,
+        _versions(cache, [f'course:{course_id}' if course_id else 'files'], embed_uploader),
+    )
+    validator.check()
+    return validator.apply(
+        _listing(
+            db, file_crud.get_recent_uploads(db, limit, cache, course_id), embed_uploader, cache
+        )
+    )
+
+
+@router.get('/feed', response_model=ResponseModel[List[FileResponseSchema]])
+async def get_feed(
+    request: Request,
+    limit: int = Query(default=20, ge=1, le=100, description="Number of files to retrieve (1-100)"),
+    embed_uploader: bool = Depends(embed_uploader_query),
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
 ):
-    """Get the most recent file uploads across all users and courses."""
-    return file_crud.get_recent_uploads(db, limit)
+    """New files in the courses the current user has bookmarked files of or uploaded to."""
+    # Any upload may reach the feed; bookmark changes bump the user's version
+    validator = CacheValidator(
+        request,
+        _versions(cache, ['files', f"user:{user['user_id']}"], embed_uploader),
+        private=True,
+    )
+    validator.check()
+    return validator.apply(
+        _listing(db, FeedCRUD.get_feed(db, user['user_id'], limit, cache), embed_uploader, cache)
+    )
 
 
 @router.get('', response_model=ResponseModel[List[FileResponseSchema]])
-async def read_all_file(token: str | None = Cookie(default=None), db: Session = Depends(get_db)):
-    user = jwt_service.verify_token(token)
-    return file_crud.read_all_file(db, user['user_id'])
+async def read_all_file(
+    request: Request,
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+):
+    validator = CacheValidator(
+        request, _versions(cache, [f"user:{user['user_id']}"]), private=True
+    )
+    validator.check()
+    return validator.apply(
+        _listing(db, file_crud.read_all_file(db, user['user_id'], cache), False, cache)
+    )
 
 
 @router.get('/course/{course_id}', response_model=ResponseModel[List[FileResponseSchema]])
 async def get_files_by_course(
     course_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    embed_uploader: bool = Depends(embed_uploader_query),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
 ):
-    return file_crud.get_files_by_course(db, course_id)
+    validator = CacheValidator(
+        request, _versions(cache, [f'course:{course_id}'], embed_uploader)
+    )
+    validator.check()
+    return validator.apply(
+        _listing(db, file_crud.get_files_by_course(db, course_id, cache), embed_uploader, cache)
+    )
+
+
+@router.get('/course/{course_id}/archive')
+async def download_course_archive(
+    course_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    client: httpx.AsyncClient = Depends(get_storage_client),
+):
+    """
+    Every file of a course as one ZIP, with a folder per exam type.
+
+    The first download after an upload or delete builds the archive while streaming it; later ones
+    are served from the stored copy.
+    """
+    return await file_crud.download_course_archive(db, course_id, request, client)
+
+
+@router.get('/instructor/{instructor_name}', response_model=ResponseModel[List[FileResponseSchema]])
+async def get_files_by_instructor(
+    instructor_name: str,
+    request: Request,
+    embed_uploader: bool = Depends(embed_uploader_query),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    catalog: CourseCatalog = Depends(get_course_catalog),
+):
+    """Get files of every course taught by an instructor (exact name)."""
+    # Course/instructor links only change with a catalog import
+    versions = _versions(cache, ['files'], embed_uploader)
+    catalog_version = catalog.version(db)
+    if versions is not None and catalog_version is not None:
+        versions.append(catalog_version)
+    else:
+        versions = None
+    validator = CacheValidator(request, versions)
+    validator.check()
+    return validator.apply(
+        _listing(db, file_crud.get_files_by_instructor(db, instructor_name), embed_uploader, cache)
+    )
 
 
 @router.post('', response_model=ResponseModel[FileResponseSchema])
@@ -50,10 +180,11 @@ async def create_file(
     exam_type: ExamType = Form(ExamType.OTHERS),
     info: Optional[str] = Form(None),
     anonymous: bool = Form(False),
-    token: str | None = Cookie(default=None),
+    user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    events: EventBroker = Depends(get_event_broker),
 ):
-    user = jwt_service.verify_token(token)
     file_data = FileCreateSchema(
         filename=file_name, 
         user_id=user['user_id'],
@@ -62,44 +193,93 @@ async def create_file(
         info=info,
         anonymous=anonymous
     )
-    return await file_crud.create_file(db, file_data, upload_file)
+    return await file_crud.create_file(db, file_data, upload_file, cache, events)
+
+
+@router.post('/batch-get', response_model=ResponseModel[List[Optional[FileResponseSchema]]])
+async def batch_get_files(
+    batch: FileBatchGet,
+    embed_uploader: bool = Depends(embed_uploader_query),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+):
+    """
+    Metadata of up to 500 files in one request.
+
+    Results follow the order of `file_ids`, with null for files that don't exist.
+    """
+    return _listing(
+        db, file_crud.get_files_by_ids(db, batch.file_ids, cache), embed_uploader, cache
+    )
 
 
 @router.get('/{file_id}', response_model=ResponseModel[FileResponseSchema])
 async def get_file(
     file_id: str, 
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+):
+    validator = CacheValidator(request, _versions(cache, ['files']))
+    validator.check()
+    return validator.apply(ModelResponse(file_crud.get_file_by_id(db, file_id, cache)))
+
+
+@router.get('/{file_id}/download')
+async def download_file(
+    file_id: str,
+    request: Request,
+    download: bool = Query(default=False, description="Save as an attachment instead of inline"),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    client: httpx.AsyncClient = Depends(get_storage_client),
 ):
-    return file_crud.get_file_by_id(db, file_id)
+    """
+    Stream a file's content through the backend, for deployments with private buckets.
+
+    Supports `Range` (206 partial content) and `If-None-Match`/`If-Modified-Since` (304) against
+    the stored object's ETag.
+    """
+    return await file_crud.download_file(db, file_id, request, client, cache, download)
 
 
 @router.delete('/admin/{file_id}', response_model=ResponseModel[None])
 async def admin_delete_file(
     file_id: str, 
-    token: str | None = Cookie(default=None), 
+    user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db),
-    cache: CacheService = Depends(get_cache)
+    cache: CacheService = Depends(get_cache),
+    events: EventBroker = Depends(get_event_broker),
 ):
     """Admin delete file - only specific admin user can delete any file"""
-    user = jwt_service.verify_token(token)
-    return file_crud.admin_delete_file(db, file_id, user['user_id'], cache)
+    return file_crud.admin_delete_file(db, file_id, user['user_id'], cache, events)
 
 
 @router.delete('/{file_id}', response_model=ResponseModel[None])
 async def delete_file(
     file_id: str, 
-    token: str | None = Cookie(default=None), 
-    db: Session = Depends(get_db)
+    user: Dict = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
+    events: EventBroker = Depends(get_event_broker),
 ):
     """Delete file - users can only delete their own files"""
-    user = jwt_service.verify_token(token)
-    return file_crud.delete_file(db, file_id, user['user_id'])
+    return file_crud.delete_file(db, file_id, user['user_id'], cache, events)
+
+
+@router.get('/admin/url-signing')
+async def get_url_signing_stats(user: Dict = Depends(get_current_user)):
+    """Download link signing counters of this worker process (admin only)"""
+    ADMIN_USER_ID = "115261598260176932528"
+
+    if user['user_id'] != ADMIN_USER_ID:
+        raise HTTPException(status_code=403, detail='Access denied. Admin privileges required.')
+    return ResponseModel(status=ResponseStatus.SUCCESS, data=signing_stats.snapshot())
 
 
 @router.get('/admin/test')
-async def test_admin(token: str | None = Cookie(default=None)):
+async def test_admin(user: Dict = Depends(get_current_user)):
     """Test admin access"""
-    user = jwt_service.verify_token(token)
     ADMIN_USER_ID = "115261598260176932528"
     
     if user['user_id'] == ADMIN_USER_ID:
@@ -1,17 +1,19 @@
 from typing import Dict
 
-from fastapi import APIRouter, Cookie, Depends, File, Form, HTTPException, Response, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile
 from fastapi.responses import JSONResponse, RedirectResponse
 from sqlalchemy.orm import Session
 
 from core.config import get_settings
+from core.dependencies import get_cache, get_current_user
 from crud.auth import GoogleAuthProvider
 from crud.user import UserCRUD
 from db.db import get_db
-from schemas.common import ResponseModel, ResponseStatus
+from schemas.common import ResponseModel
 from schemas.user import UserResponse as UserResponseSchema
 from schemas.user import UserUpdate as UserUpdateSchema
 from services.auth import AuthCookieService, JWTService
+from services.cache import CacheService
 
 router = APIRouter(tags=['user'], prefix='/api/v1/user')
 
@@ -23,21 +25,18 @@ settings = get_settings()
 
 
 @router.get('/profile', response_model=ResponseModel[UserResponseSchema])
-async def get_user_profile(db: Session = Depends(get_db), token: str | None = Cookie(default=None)):
-    if not token:
-        return ResponseModel(status=ResponseStatus.ERROR, message='Not authenticated', data=None)
-    return user_crud.get_user_profile(db, token)
+async def get_user_profile(db: Session = Depends(get_db), user: Dict = Depends(get_current_user)):
+    return user_crud.get_user_profile(db, user['user_id'])
 
 
 @router.patch('/profile', response_model=ResponseModel[UserResponseSchema])
 async def update_user_profile(
     update_data: UserUpdateSchema,
     db: Session = Depends(get_db),
-    token: str | None = Cookie(default=None),
+    cache: CacheService = Depends(get_cache),
+    user: Dict = Depends(get_current_user),
 ):
-    if not token:
-        return ResponseModel(status=ResponseStatus.ERROR, message='Not authenticated', data=None)
-    return user_crud.update_user_profile(db, token, update_data)
+    return user_crud.update_user_profile(db, user['user_id'], update_data, cache)
 
 
 @router.get('/google/login')
@@ -55,7 +54,7 @@ async def google_oauth_callback(
     code: str, db: Session = Depends(get_db), response: Response = None
 ) -> ResponseModel[Dict]:
     try:
-        auth_result = auth_provider.process_oauth_callback(db=db, code=code)
+        auth_result = await auth_provider.process_oauth_callback_async(db=db, code=code)
         user_info = auth_result['user']
         token = jwt_service.create_token(
             {
@@ -91,17 +90,14 @@ async def google_logout(response: Response):
 async def upload_avatar(
     upload_file: UploadFile = File(...),
     file_name: str = Form(...),
-    token: str | None = Cookie(default=None),
+    user: Dict = Depends(get_current_user),
     db: Session = Depends(get_db),
+    cache: CacheService = Depends(get_cache),
 ):
-    if not token:
-        return ResponseModel(status=ResponseStatus.ERROR, message='Not authenticated', data=None)
     print(file_name)
-    return await user_crud.upload_avatar(db, token, upload_file)
+    return await user_crud.upload_avatar(db, user['user_id'], upload_file, cache)
 
 
 @router.get('/avatar')
-async def get_avatar(db: Session = Depends(get_db), token: str | None = Cookie(default=None)):
-    if not token:
-        return ResponseModel(status=ResponseStatus.ERROR, message='Not authenticated', data=None)
-    return await user_crud.get_avatar(db, token)
+async def get_avatar(db: Session = Depends(get_db), user: Dict = Depends(get_current_user)):
+    return await user_crud.get_avatar(db, user['user_id'])
@@ -0,0 +1,7 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class BookmarkStatusRequest(BaseModel):
+    file_ids: List[str] = Field(..., min_length=1, max_length=200)
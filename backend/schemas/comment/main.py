@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel, Field
 
@@ -6,6 +7,7 @@ from pydantic import BaseModel, Field
 class CommentBase(BaseModel):
     commenter_id: str = 'DennisLee03'
     content: str = 'Hello World!'
+    file_id: Optional[str] = Field(default=None, description='File the comment belongs to')
 
 
 class CommentCreate(CommentBase):
@@ -1,7 +1,10 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict
 
+from schemas.file import FileResponse
+
 
 class CourseBase(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -26,6 +29,32 @@ class CourseResponse(CourseBase):
     pass
 
 
+class CourseSuggestion(BaseModel):
+    course_id: str
+    courseName: str
+    instructors: str
+
+
+class CourseStatsResponse(BaseModel):
+    course_id: str
+    total_files: int = 0
+    latest_upload: Optional[datetime] = None
+    by_exam_type: Dict[str, int] = {}
+
+
+class CourseDetailFile(FileResponse):
+    # Both None for anonymous uploads (the storage path starts with the uploader id)
+    file_location: Optional[str] = None
+    user_id: Optional[str] = None
+    is_bookmarked: bool = False
+
+
+class CourseDetailResponse(BaseModel):
+    course: CourseResponse
+    files: List[CourseDetailFile]
+    stats: CourseStatsResponse
+
+
 class CourseSearchParams(BaseModel):
     semester: Optional[str] = None
     departmentId: Optional[str] = None
@@ -40,5 +69,7 @@ class CourseSearchParams(BaseModel):
     tags: Optional[str] = None
     credits: Optional[str] = None
     instructors: Optional[str] = None
+    instructor: Optional[str] = None  # Exact instructor name, uses the instructors table
+    tag: Optional[str] = None  # Exact tag, uses the tags table
     course_id: Optional[str] = None
     search_text: Optional[str] = None  # For full-text search across multiple fields
@@ -1,9 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 from models.file import ExamType
+from schemas.user import UploaderProfile
 
 
 class FileBase(BaseModel):
@@ -31,3 +32,9 @@ class FileCreate(BaseModel):
 class FileResponse(FileBase):
     file_id: str
     timestamp: datetime
+    uploader: Optional[UploaderProfile] = None  # Only with embed_uploader, never if anonymous
+    download_url: Optional[str] = None  # Presigned when buckets are private
+
+
+class FileBatchGet(BaseModel):
+    file_ids: List[str] = Field(min_length=1, max_length=500)
@@ -22,6 +22,15 @@ class UserResponse(UserBase):
     timestamp: datetime
 
 
+class UploaderProfile(BaseModel):
+    """What a file listing shows of its uploader"""
+
+    model_config = ConfigDict(from_attributes=True)
+    user_id: str
+    username: str
+    avatar: Optional[str] = None
+
+
 class UserUpdate(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     username: Optional[str] = None
@@ -1,3 +1,4 @@
+import hashlib
 from datetime import datetime, timedelta, timezone
 from typing import Dict
 
@@ -6,6 +7,11 @@ from fastapi import Response, HTTPException
 
 from core.config import get_settings
 from core.interfaces import CookieService, TokenService
+from services.cache import TTLCache
+
+# sha256(token) -> claims of tokens whose signature already checked out. Entries expire at the
+# token's own `exp` (if any), so a cached token is never accepted after it would fail to decode.
+verified_tokens = TTLCache(maxsize=10000, ttl=300)
 
 
 class JWTService(TokenService):
@@ -26,14 +32,22 @@ class JWTService(TokenService):
     def verify_token(self, token: str) -> Dict:
         if not token:
             raise HTTPException(status_code=401, detail='Token is required')
+        digest = hashlib.sha256(token.encode()).hexdigest()
+        claims = verified_tokens.get(digest)
+        if claims is not None:
+            return dict(claims)
+
         settings = get_settings()
         try:
-            return jwt.decode(
+            claims = jwt.decode(
                 token,
                 settings.jwt_secret_key,
                 algorithms=[settings.jwt_algorithm],
                 leeway=timedelta(seconds=30),
             )
+            # A token without `exp` never expires on decode; it is rechecked after the cache TTL
+            verified_tokens.set(digest, claims, expires_at=claims.get('exp'))
+            return dict(claims)
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=401,
@@ -1,10 +1,115 @@
 import json
-from typing import Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, List, Optional
 import redis
 from core.config import get_settings
 
 settings = get_settings()
 
+# Member marking a user's bookmark set as complete; only load_bookmark_set creates the set (with a
+# TTL), write-through adds go to loaded sets only.
+BOOKMARK_SET_SENTINEL = '__loaded__'
+
+# Structures rebuilt from the database (bookmark sets, timelines, feeds) have a generation counter
+# under "gen:{key}", bumped by every write-through. A rebuild reads it before its query and only
+# stores its result if the counter is unchanged, so a write committed in between is never lost
+# under a complete-looking set; the next read rebuilds instead. The counters outlive any rebuild.
+GENERATION_TTL = 3600
+
+# INCRBY only when the counter exists, so a write never creates a wrong count from zero
+INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+# SADD only to a loaded set, so a write never creates a partial set without the sentinel and TTL
+SADD_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('SADD', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+# Recent-upload timelines are sorted sets of file ids scored by upload time, capped at
+# TIMELINE_SIZE entries. A sentinel scored -inf marks a set loaded from the database, so an empty
+# timeline is still a hit and a missing key is rebuilt.
+TIMELINE_SIZE = 100
+TIMELINE_SENTINEL = '__loaded__'
+
+# Add to a loaded timeline and drop the oldest entries past the cap (rank 0 is the sentinel)
+TIMELINE_ADD = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 1, -(tonumber(ARGV[3]) + 1))
+end
+return nil
+"""
+
+# Home feeds reuse the timeline layout: a capped sorted set of pushed file ids per user
+FEED_SIZE = 200
+
+# Register a popular course on a loaded feed, so its uploads are merged in at read time
+FEED_PULL_ADD = """
+local ttl = redis.call('TTL', KEYS[1])
+if ttl > 0 then
+    redis.call('SADD', KEYS[2], ARGV[1])
+    redis.call('EXPIRE', KEYS[2], ttl)
+end
+return nil
+"""
+
+# Remove from a timeline; a full timeline may have trimmed older files that should now move up,
+# so it is dropped and rebuilt on the next read instead
+TIMELINE_REMOVE = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 1
+    and redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+end
+return nil
+"""
+
+
+class TTLCache:
+    """Small in-process LRU cache whose entries each carry their own expiry time.
+
+    Thread-safe: sync dependencies (token checks, profile lookups) call it from the threadpool.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                self.entries.pop(key, None)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, expires_at: Optional[float] = None) -> None:
+        """Store `value` until `expires_at` (epoch seconds), but never longer than the TTL"""
+        limit = time.time() + self.ttl
+        with self.lock:
+            self.entries[key] = (value, limit if expires_at is None else min(expires_at, limit))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
 
 class CacheService:
     def __init__(self):
@@ -23,6 +128,11 @@ class CacheService:
             )
             # Test the connection
             self.redis_client.ping()
+            self.incr_if_exists = self.redis_client.register_script(INCR_IF_EXISTS)
+            self.sadd_if_exists = self.redis_client.register_script(SADD_IF_EXISTS)
+            self.timeline_add = self.redis_client.register_script(TIMELINE_ADD)
+            self.timeline_remove = self.redis_client.register_script(TIMELINE_REMOVE)
+            self.feed_pull_add = self.redis_client.register_script(FEED_PULL_ADD)
             self.redis_available = True
             print("Redis connection established successfully")
         except Exception as e:
@@ -92,6 +202,88 @@ class CacheService:
             print(f"Cache exists error: {e}")
             return False
 
+    def publish(self, channel: str, message: str) -> bool:
+        """Publish a message on a pub/sub channel"""
+        if not self.redis_available:
+            return False
+
+        try:
+            self.redis_client.publish(channel, message)
+            return True
+        except Exception as e:
+            print(f"Cache publish error: {e}")
+            return False
+
+    # Version counters behind HTTP validators: a hash per scope ("files", "course:{id}",
+    # "user:{id}") holding the version and the time of the last write. A missing counter starts
+    # at the current time in milliseconds, so a recreated counter never repeats an old ETag.
+
+    def get_versions(self, scopes: List[str]) -> Optional[List[tuple]]:
+        """(version, modified epoch seconds) of each scope, or None without Redis"""
+        if not self.redis_available:
+            return None
+
+        try:
+            now = time.time()
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for scope in scopes:
+                pipeline.hsetnx(f"version:{scope}", "v", int(now * 1000))
+                pipeline.hsetnx(f"version:{scope}", "t", now)
+                pipeline.hmget(f"version:{scope}", "v", "t")
+            results = pipeline.execute()
+            return [(version, float(modified)) for version, modified in results[2::3]]
+        except Exception as e:
+            print(f"Cache get versions error: {e}")
+            return None
+
+    def bump_versions(self, scopes: Iterable[str]) -> None:
+        """Invalidate the HTTP validators of `scopes` after a write"""
+        if not self.redis_available:
+            return
+
+        try:
+            now = time.time()
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for scope in scopes:
+                pipeline.hsetnx(f"version:{scope}", "v", int(now * 1000))
+                pipeline.hincrby(f"version:{scope}", "v", 1)
+                pipeline.hset(f"version:{scope}", "t", now)
+            pipeline.execute()
+        except Exception as e:
+            print(f"Cache bump versions error: {e}")
+
+    def generation(self, key: str) -> Optional[str]:
+        """Generation of a rebuildable structure, read before loading it from the database"""
+        if not self.redis_available:
+            return None
+
+        try:
+            return self.redis_client.get(f"gen:{key}")
+        except Exception as e:
+            print(f"Cache generation error: {e}")
+            return None
+
+    def _bump_generations(self, pipeline, keys: Iterable[str]) -> None:
+        for key in keys:
+            pipeline.incr(f"gen:{key}")
+            pipeline.expire(f"gen:{key}", GENERATION_TTL)
+
+    def _load_if_unchanged(
+        self, key: str, generation: Optional[str], fill: Callable[[Any], None]
+    ) -> bool:
+        """Run the writes of `fill` atomically, unless `key` was written since `generation`"""
+        with self.redis_client.pipeline() as pipeline:
+            try:
+                pipeline.watch(f"gen:{key}")
+                if pipeline.get(f"gen:{key}") != generation:
+                    return False
+                pipeline.multi()
+                fill(pipeline)
+                pipeline.execute()
+                return True
+            except redis.WatchError:
+                return False
+
     # Specific cache methods for the application
     
     def get_file_cache(self, file_id: str) -> Optional[dict]:
@@ -102,6 +294,31 @@ class CacheService:
         """Cache file data for 30 minutes by default"""
         return self.set(f"file:{file_id}", file_data, expire)
 
+    def get_file_caches(self, file_ids: List[str]) -> List[Optional[dict]]:
+        """Cached file data of many files with one MGET, None where not cached"""
+        if not self.redis_available or not file_ids:
+            return [None] * len(file_ids)
+
+        try:
+            files = self.redis_client.mget([f"file:{file_id}" for file_id in file_ids])
+            return [json.loads(file) if file else None for file in files]
+        except Exception as e:
+            print(f"Cache get files error: {e}")
+            return [None] * len(file_ids)
+
+    def set_file_caches(self, files: dict, expire: int = 1800) -> None:
+        """Cache file data of many files, keyed by file id, in one round trip"""
+        if not self.redis_available or not files:
+            return
+
+        try:
+            pipeline = self.redis_client.pipeline()
+            for file_id, file_data in files.items():
+                pipeline.setex(f"file:{file_id}", expire, json.dumps(file_data, default=str))
+            pipeline.execute()
+        except Exception as e:
+            print(f"Cache set files error: {e}")
+
     def delete_file_cache(self, file_id: str) -> bool:
         """Delete cached file data"""
         return self.delete(f"file:{file_id}")
@@ -154,13 +371,367 @@ class CacheService:
         if course_id:
             self.delete_course_files_cache(course_id)
         
+        # A deleted file takes its comments with it
+        self.delete(f"file_comment_count:{file_id}")
+
+        # Listings containing the file now answer with a new ETag
+        scopes = ["files", f"user:{user_id}"]
+        if course_id:
+            scopes.append(f"course:{course_id}")
+        self.bump_versions(scopes)
+
         # Delete user bookmarks cache (in case this file was bookmarked)
         self.delete_pattern(f"user_bookmarks:*")
 
+    def get_comment_counts(self, file_ids: List[str]) -> List[Optional[int]]:
+        """Cached comment counts of files, None where not cached"""
+        if not self.redis_available or not file_ids:
+            return [None] * len(file_ids)
+
+        try:
+            keys = [f"file_comment_count:{file_id}" for file_id in file_ids]
+            counts = self.redis_client.mget(keys)
+            return [int(count) if count is not None else None for count in counts]
+        except Exception as e:
+            print(f"Cache get comment counts error: {e}")
+            return [None] * len(file_ids)
+
+    def set_comment_counts(self, counts: dict, expire: int = 300) -> None:
+        """
+        Cache comment counts loaded from the database.
+
+        A comment committed between the load and this write isn't counted, so the keys are only
+        created if still missing and live a few minutes.
+        """
+        if not self.redis_available or not counts:
+            return
+
+        try:
+            pipeline = self.redis_client.pipeline()
+            for file_id, count in counts.items():
+                pipeline.set(f"file_comment_count:{file_id}", count, ex=expire, nx=True)
+            pipeline.execute()
+        except Exception as e:
+            print(f"Cache set comment counts error: {e}")
+
+    def invalidate_comment_count(self, file_id: str) -> None:
+        """Drop a file's comment count after a comment was committed or deleted"""
+        self.delete(f"file_comment_count:{file_id}")
+
+    def get_uploader_profiles(self, user_ids: List[str]) -> List[Optional[dict]]:
+        """Cached uploader profiles, None where not cached"""
+        if not self.redis_available or not user_ids:
+            return [None] * len(user_ids)
+
+        try:
+            profiles = self.redis_client.mget([f"profile:{user_id}" for user_id in user_ids])
+            return [json.loads(profile) if profile is not None else None for profile in profiles]
+        except Exception as e:
+            print(f"Cache get uploader profiles error: {e}")
+            return [None] * len(user_ids)
+
+    def set_uploader_profiles(self, profiles: dict, expire: int = 3600) -> None:
+        """Cache uploader profiles loaded from the database"""
+        if not self.redis_available or not profiles:
+            return
+
+        try:
+            pipeline = self.redis_client.pipeline()
+            for user_id, profile in profiles.items():
+                pipeline.set(f"profile:{user_id}", json.dumps(profile), ex=expire)
+            pipeline.execute()
+        except Exception as e:
+            print(f"Cache set uploader profiles error: {e}")
+
+    def invalidate_uploader_profile(self, user_id: str) -> None:
+        """Drop a changed profile and the validators of listings embedding profiles"""
+        self.delete(f"profile:{user_id}")
+        self.bump_versions(["profiles"])
+
     def get_course_cache(self, course_id: str) -> Optional[dict]:
         """Get cached course data"""
         return self.get(f"course:{course_id}")
 
     def set_course_cache(self, course_id: str, course_data: dict, expire: int = 3600) -> bool:
         """Cache course data for 1 hour by default"""
-        return self.set(f"course:{course_id}", course_data, expire) 
\ No newline at end of file
+        return self.set(f"course:{course_id}", course_data, expire)
+
+    def get_course_detail_cache(self, course_id: str, version: str) -> Optional[dict]:
+        """Get the shared part of a course page cached at `version`"""
+        return self.get(f"course_detail:{course_id}:{version}")
+
+    def set_course_detail_cache(
+        self, course_id: str, version: str, detail_data: dict, expire: int = 900
+    ) -> bool:
+        """Cache the shared part of a course page; a version bump orphans it until it expires"""
+        return self.set(f"course_detail:{course_id}:{version}", detail_data, expire)
+
+    # Bookmark index: a set of file ids per user and a bookmark counter per file
+
+    def get_bookmark_flags(self, user_id: str, file_ids: List[str]) -> Optional[List[bool]]:
+        """Bookmark state of each file id, or None if the user's set isn't loaded"""
+        if not self.redis_available:
+            return None
+
+        try:
+            flags = self.redis_client.smismember(
+                f"user_bookmark_ids:{user_id}", [BOOKMARK_SET_SENTINEL, *file_ids]
+            )
+            if not flags[0]:
+                return None
+            return [bool(flag) for flag in flags[1:]]
+        except Exception as e:
+            print(f"Cache bookmark flags error: {e}")
+            return None
+
+    def load_bookmark_set(
+        self, user_id: str, file_ids: Iterable[str], generation: Optional[str], expire: int = 3600
+    ) -> bool:
+        """Replace a user's bookmark set with the ids loaded from the database at `generation`"""
+        if not self.redis_available:
+            return False
+
+        try:
+            key = f"user_bookmark_ids:{user_id}"
+
+            def fill(pipeline) -> None:
+                pipeline.delete(key)
+                pipeline.sadd(key, BOOKMARK_SET_SENTINEL, *file_ids)
+                pipeline.expire(key, expire)
+
+            return self._load_if_unchanged(key, generation, fill)
+        except Exception as e:
+            print(f"Cache load bookmark set error: {e}")
+            return False
+
+    def add_bookmark_to_index(self, user_id: str, file_id: str) -> None:
+        """Write-through for a new bookmark"""
+        if not self.redis_available:
+            return
+
+        try:
+            pipeline = self.redis_client.pipeline()
+            self.sadd_if_exists(
+                keys=[f"user_bookmark_ids:{user_id}"], args=[file_id], client=pipeline
+            )
+            self.incr_if_exists(keys=[f"file_bookmark_count:{file_id}"], args=[1], client=pipeline)
+            self._bump_generations(pipeline, [f"user_bookmark_ids:{user_id}"])
+            pipeline.execute()
+        except Exception as e:
+            print(f"Cache add bookmark error: {e}")
+
+    def remove_bookmark_from_index(self, user_id: str, file_id: str) -> None:
+        """Write-through for a removed bookmark"""
+        if not self.redis_available:
+            return
+
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.srem(f"user_bookmark_ids:{user_id}", file_id)
+            self.incr_if_exists(keys=[f"file_bookmark_count:{file_id}"], args=[-1], client=pipeline)
+            self._bump_generations(pipeline, [f"user_bookmark_ids:{user_id}"])
+            pipeline.execute()
+        except Exception as e:
+            print(f"Cache remove bookmark error: {e}")
+
+    def get_bookmark_count(self, file_id: str) -> Optional[int]:
+        """Get cached bookmark count of a file"""
+        if not self.redis_available:
+            return None
+
+        try:
+            count = self.redis_client.get(f"file_bookmark_count:{file_id}")
+            return int(count) if count is not None else None
+        except Exception as e:
+            print(f"Cache get bookmark count error: {e}")
+            return None
+
+    def set_bookmark_count(self, file_id: str, count: int, expire: int = 86400) -> bool:
+        """Cache a bookmark count loaded from the database"""
+        if not self.redis_available:
+            return False
+
+        try:
+            return bool(
+                self.redis_client.set(f"file_bookmark_count:{file_id}", count, ex=expire, nx=True)
+            )
+        except Exception as e:
+            print(f"Cache set bookmark count error: {e}")
+            return False
+
+    # Recent-upload timelines: global, per user and per course
+
+    def get_timeline(self, key: str, limit: int) -> Optional[List[str]]:
+        """Newest `limit` file ids of a timeline, or None if it isn't loaded"""
+        if not self.redis_available:
+            return None
+
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.zscore(key, TIMELINE_SENTINEL)
+            pipeline.zrevrange(key, 0, limit - 1)
+            loaded, file_ids = pipeline.execute()
+            if loaded is None:
+                return None
+            return [file_id for file_id in file_ids if file_id != TIMELINE_SENTINEL]
+        except Exception as e:
+            print(f"Cache get timeline error: {e}")
+            return None
+
+    def load_timeline(
+        self, key: str, entries: Iterable[tuple], generation: Optional[str], expire: int = 86400
+    ) -> bool:
+        """Replace a timeline with (file_id, score) entries loaded at `generation`"""
+        if not self.redis_available:
+            return False
+
+        try:
+            mapping = {TIMELINE_SENTINEL: float('-inf')}
+            mapping.update(entries)
+
+            def fill(pipeline) -> None:
+                pipeline.delete(key)
+                pipeline.zadd(key, mapping)
+                pipeline.expire(key, expire)
+
+            return self._load_if_unchanged(key, generation, fill)
+        except Exception as e:
+            print(f"Cache load timeline error: {e}")
+            return False
+
+    def add_to_timelines(
+        self, keys: Iterable[str], file_id: str, score: float, size: int = TIMELINE_SIZE
+    ) -> None:
+        """Write-through for a new upload"""
+        if not self.redis_available:
+            return
+
+        try:
+            keys = list(keys)
+            pipeline = self.redis_client.pipeline()
+            for key in keys:
+                self.timeline_add(keys=[key], args=[score, file_id, size], client=pipeline)
+            self._bump_generations(pipeline, keys)
+            pipeline.execute()
+        except Exception as e:
+            print(f"Cache add to timelines error: {e}")
+
+    def remove_from_timelines(self, keys: Iterable[str], file_id: str) -> None:
+        """Write-through for a deleted upload"""
+        if not self.redis_available:
+            return
+
+        try:
+            keys = list(keys)
+            pipeline = self.redis_client.pipeline()
+            for key in keys:
+                self.timeline_remove(keys=[key], args=[file_id, TIMELINE_SIZE], client=pipeline)
+            self._bump_generations(pipeline, keys)
+            pipeline.execute()
+        except Exception as e:
+            print(f"Cache remove from timelines error: {e}")
+
+    # Home feeds: pushed file ids per user plus the popular courses merged in at read time
+
+    def get_feed(self, user_id: str, limit: int) -> Optional[tuple]:
+        """(pushed file ids, pulled course ids) of a user's feed, or None if it isn't loaded"""
+        if not self.redis_available:
+            return None
+
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.zscore(f"feed:user:{user_id}", TIMELINE_SENTINEL)
+            pipeline.zrevrange(f"feed:user:{user_id}", 0, limit - 1)
+            pipeline.smembers(f"feed:pull:{user_id}")
+            loaded, file_ids, course_ids = pipeline.execute()
+            if loaded is None:
+                return None
+            return [file_id for file_id in file_ids if file_id != TIMELINE_SENTINEL], course_ids
+        except Exception as e:
+            print(f"Cache get feed error: {e}")
+            return None
+
+    def load_feed(
+        self,
+        user_id: str,
+        entries: Iterable[tuple],
+        course_ids: Iterable[str],
+        generation: Optional[str],
+        expire: int = 3600,
+    ) -> bool:
+        """Replace a user's feed with entries and pulled courses loaded at `generation`"""
+        if not self.redis_available:
+            return False
+
+        try:
+            mapping = {TIMELINE_SENTINEL: float('-inf')}
+            mapping.update(entries)
+            course_ids = list(course_ids)
+
+            def fill(pipeline) -> None:
+                pipeline.delete(f"feed:user:{user_id}", f"feed:pull:{user_id}")
+                pipeline.zadd(f"feed:user:{user_id}", mapping)
+                pipeline.expire(f"feed:user:{user_id}", expire)
+                if course_ids:
+                    pipeline.sadd(f"feed:pull:{user_id}", *course_ids)
+                    pipeline.expire(f"feed:pull:{user_id}", expire)
+
+            return self._load_if_unchanged(f"feed:user:{user_id}", generation, fill)
+        except Exception as e:
+            print(f"Cache load feed error: {e}")
+            return False
+
+    def delete_feed(self, user_id: str) -> bool:
+        """Drop a user's feed after their followed courses changed"""
+        if not self.redis_available:
+            return False
+
+        try:
+            pipeline = self.redis_client.pipeline()
+            pipeline.delete(f"feed:user:{user_id}", f"feed:pull:{user_id}")
+            self._bump_generations(pipeline, [f"feed:user:{user_id}"])
+            return bool(pipeline.execute()[0])
+        except Exception as e:
+            print(f"Cache delete feed error: {e}")
+            return False
+
+    def add_feed_pull(self, user_ids: Iterable[str], course_id: str) -> None:
+        """Make the loaded feeds of `user_ids` merge in `course_id` at read time"""
+        if not self.redis_available:
+            return
+
+        try:
+            pipeline = self.redis_client.pipeline()
+            for user_id in user_ids:
+                self.feed_pull_add(
+                    keys=[f"feed:user:{user_id}", f"feed:pull:{user_id}"],
+                    args=[course_id],
+                    client=pipeline,
+                )
+                self._bump_generations(pipeline, [f"feed:user:{user_id}"])
+            pipeline.execute()
+        except Exception as e:
+            print(f"Cache add feed pull error: {e}")
+
+    def get_popular_courses(self, course_ids: List[str]) -> List[str]:
+        """The courses of `course_ids` whose uploads are no longer fanned out"""
+        if not self.redis_available or not course_ids:
+            return []
+
+        try:
+            flags = self.redis_client.smismember("feed:popular_courses", course_ids)
+            return [course_id for course_id, flag in zip(course_ids, flags) if flag]
+        except Exception as e:
+            print(f"Cache get popular courses error: {e}")
+            return []
+
+    def mark_popular_course(self, course_id: str) -> bool:
+        """Stop fanning out a course's uploads; True if it wasn't marked before"""
+        if not self.redis_available:
+            return False
+
+        try:
+            return bool(self.redis_client.sadd("feed:popular_courses", course_id))
+        except Exception as e:
+            print(f"Cache mark popular course error: {e}")
+            return False
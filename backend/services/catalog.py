@@ -0,0 +1,272 @@
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from models.course import Course
+from schemas.course import CourseResponse, CourseSearchParams
+from utils.course import index_tokens, is_cjk, query_tokens, search_terms
+
+# Columns compared with `==` by search_courses, besides the ones with their own inverted index
+EXACT_FIELDS = (
+    'serialNumber',
+    'attributeCode',
+    'systemCode',
+    'forGrade',
+    'forClass',
+    'courseName',
+    'credits',
+)
+
+
+def _split(value: str | None) -> List[str]:
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+class CatalogSnapshot:
+    """Immutable, columnar copy of the courses table with inverted indexes over row numbers."""
+
+    def __init__(self, courses: Iterable[Course]):
+        self.responses: List[CourseResponse] = [CourseResponse.model_validate(c) for c in courses]
+        self.row_by_id: Dict[str, int] = {
+            course.course_id: row for row, course in enumerate(self.responses)
+        }
+        # One tuple per column keeps attribute access out of the filter loops
+        self.columns: Dict[str, Tuple[str, ...]] = {
+            field: tuple(getattr(course, field) or '' for course in self.responses)
+            for field in (*EXACT_FIELDS, 'tags')
+        }
+        self.lower_names = tuple(course.courseName.lower() for course in self.responses)
+        self.lower_details = tuple(
+            f'{course.instructors or ""}\n{course.courseNote or ""}'.lower()
+            for course in self.responses
+        )
+
+        self.by_semester = self._index(c.semester for c in self.responses)
+        self.by_department = self._index(c.departmentId for c in self.responses)
+        self.by_category = self._index(c.category for c in self.responses)
+        self.by_instructor = self._index_many(_split(c.instructors) for c in self.responses)
+        self.by_tag = self._index_many(_split(c.tags) for c in self.responses)
+        self.by_name_token = self._index_many(index_tokens(c.courseName) for c in self.responses)
+        self.by_detail_token = self._index_many(
+            index_tokens(f'{c.instructors or ""} {c.courseNote or ""}') for c in self.responses
+        )
+        self.by_text_token = self._index_many(self._text_tokens(c) for c in self.responses)
+        self.text_vocabulary = sorted(self.by_text_token)
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    @staticmethod
+    def _index(values: Iterable[str]) -> Dict[str, array]:
+        index: Dict[str, array] = {}
+        for row, value in enumerate(values):
+            index.setdefault(value, array('I')).append(row)
+        return index
+
+    @staticmethod
+    def _index_many(values: Iterable[Iterable[str]]) -> Dict[str, array]:
+        index: Dict[str, array] = {}
+        for row, tokens in enumerate(values):
+            for token in tokens:
+                index.setdefault(token, array('I')).append(row)
+        return index
+
+    @staticmethod
+    def _text_tokens(course: CourseResponse) -> set:
+        tokens = set(index_tokens(course.courseName)) | set(index_tokens(course.courseNote))
+        tokens.update(item.lower() for item in _split(course.instructors) + _split(course.tags))
+        tokens.update(
+            value.lower()
+            for value in (course.departmentId, course.serialNumber, course.course_id)
+            if value
+        )
+        return tokens
+
+    def prefix_rows(self, prefix: str) -> set:
+        """Rows having a search_text token starting with `prefix`."""
+        rows = set()
+        start = bisect_left(self.text_vocabulary, prefix)
+        for token in self.text_vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            rows.update(self.by_text_token[token])
+        return rows
+
+    def token_rows(self, index: Dict[str, array], tokens: List[str]) -> set:
+        """Rows containing every token of `tokens` in `index`."""
+        postings = sorted((index.get(token, ()) for token in tokens), key=len)
+        if not postings:
+            return set(range(len(self)))
+        rows = set(postings[0])
+        for posting in postings[1:]:
+            rows.intersection_update(posting)
+        return rows
+
+
+class CourseCatalog:
+    """
+    Per-process, in-memory course catalog.
+
+    The catalog is small and changes only when the crawler imports a semester, so search_courses and
+    get_course_by_id are answered from memory. Postgres stays the source of truth: a cheap
+    fingerprint of the table is compared at most every REFRESH_INTERVAL seconds and the snapshot
+    is rebuilt when it changes.
+    """
+
+    REFRESH_INTERVAL = 30
+
+    def __init__(self):
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self.fingerprint: Optional[tuple] = None
+        self.checked_at = 0.0
+        self.loaded_at = 0.0
+
+    @staticmethod
+    def _fingerprint(db: Session) -> tuple:
+        # xmin changes on every insert/update, count catches deletes
+        return tuple(
+            db.execute(
+                text('SELECT count(*), coalesce(max(xmin::text::bigint), 0) FROM courses')
+            ).one()
+        )
+
+    def load(self, db: Session) -> None:
+        fingerprint = self._fingerprint(db)
+        courses = db.scalars(select(Course).order_by(Course.course_id)).all()
+        self.snapshot = CatalogSnapshot(courses)
+        self.fingerprint = fingerprint
+        self.checked_at = time.monotonic()
+        self.loaded_at = time.time()
+        print(f'Course catalog loaded: {len(self.snapshot)} courses')
+
+    def refresh_if_stale(self, db: Session) -> None:
+        now = time.monotonic()
+        if self.snapshot is not None and now - self.checked_at < self.REFRESH_INTERVAL:
+            return
+        try:
+            if self.snapshot is None or self._fingerprint(db) != self.fingerprint:
+                self.load(db)
+            self.checked_at = now
+        except Exception as e:
+            print(f'Course catalog refresh error: {e}')
+
+    def version(self, db: Session) -> Optional[Tuple[str, float]]:
+        """(version, load time) of the snapshot answering requests, for HTTP validators"""
+        self.refresh_if_stale(db)
+        if self.snapshot is None:
+            return None
+        return repr(self.fingerprint), self.loaded_at
+
+    def get(self, db: Session, course_id: str) -> Optional[CourseResponse]:
+        self.refresh_if_stale(db)
+        if self.snapshot is None:
+            return None
+        row = self.snapshot.row_by_id.get(course_id)
+        return None if row is None else self.snapshot.responses[row]
+
+    def search(
+        self, db: Session, params: CourseSearchParams, offset: int = 0, limit: int = 10
+    ) -> Optional[Tuple[int, List[CourseResponse]]]:
+        """
+        Same filters as CourseCRUD.search_courses.
+
+        Returns None when the catalog is unavailable or the query needs Postgres (fuzzy trigram
+        matches of Latin course names with no substring hit).
+        """
+        self.refresh_if_stale(db)
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+
+        candidates: Optional[set] = None
+
+        def narrow(rows: Iterable[int]) -> None:
+            nonlocal candidates
+            candidates = set(rows) if candidates is None else candidates.intersection(rows)
+
+        if params.course_id:
+            row = snapshot.row_by_id.get(params.course_id)
+            narrow(() if row is None else (row,))
+        if params.semester:
+            narrow(snapshot.by_semester.get(params.semester, ()))
+        if params.departmentId:
+            narrow(snapshot.by_department.get(params.departmentId, ()))
+        if params.category:
+            narrow(snapshot.by_category.get(params.category, ()))
+        if params.instructor:
+            narrow(snapshot.by_instructor.get(params.instructor, ()))
+        if params.tag:
+            narrow(snapshot.by_tag.get(params.tag, ()))
+        if params.instructors:
+            # Substring match over the distinct instructor names, not over every course
+            needle = params.instructors.lower()
+            narrow(
+                row
+                for name, posting in snapshot.by_instructor.items()
+                if needle in name.lower()
+                for row in posting
+            )
+
+        name_words = params.courseNameSearch.split() if params.courseNameSearch else []
+        for word in name_words:
+            lowered = word.lower()
+            if is_cjk(word):
+                rows = snapshot.token_rows(snapshot.by_name_token, query_tokens(word))
+            else:
+                rows = range(len(snapshot)) if candidates is None else candidates
+            narrow(row for row in rows if lowered in snapshot.lower_names[row])
+
+        terms = search_terms(params.search_text) if params.search_text else []
+        for term in terms:
+            rows = snapshot.prefix_rows(term)
+            if is_cjk(term):
+                tokens = query_tokens(term)
+                rows |= {
+                    row
+                    for row in snapshot.token_rows(snapshot.by_name_token, tokens)
+                    if term in snapshot.lower_names[row]
+                }
+                rows |= {
+                    row
+                    for row in snapshot.token_rows(snapshot.by_detail_token, tokens)
+                    if term in snapshot.lower_details[row]
+                }
+            narrow(rows)
+
+        rows = range(len(snapshot)) if candidates is None else sorted(candidates)
+
+        for field in EXACT_FIELDS:
+            value = getattr(params, field)
+            if value:
+                column = snapshot.columns[field]
+                rows = [row for row in rows if column[row] == value]
+        if params.tags:
+            column = snapshot.columns['tags']
+            value = params.tags.lower()
+            rows = [row for row in rows if value in column[row].lower()]
+
+        if name_words and not rows and not all(is_cjk(word) for word in name_words):
+            return None
+
+        if params.courseNameSearch:
+            needle = params.courseNameSearch.lower()
+            rows = sorted(
+                rows,
+                key=lambda row: (
+                    snapshot.lower_names[row] != needle,
+                    not snapshot.lower_names[row].startswith(needle),
+                    needle not in snapshot.lower_names[row],
+                    len(snapshot.lower_names[row]),
+                ),
+            )
+        elif terms:
+            rows = sorted(
+                rows, key=lambda row: -sum(term in snapshot.lower_names[row] for term in terms)
+            )
+
+        rows = list(rows)
+        return len(rows), [snapshot.responses[row] for row in rows[offset : offset + limit]]
@@ -0,0 +1,168 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Optional, Set
+
+import redis.asyncio as aioredis
+from fastapi import HTTPException
+
+from core.config import get_settings
+from services.cache import CacheService
+
+settings = get_settings()
+
+# Redis pub/sub channel every worker listens on
+EVENT_CHANNEL = 'events:feed'
+
+
+def format_event(event: dict) -> bytes:
+    """One server-sent event; `event` is the type, `data` the JSON payload"""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n".encode()
+
+
+class Subscriber:
+    """A connected SSE client: a bounded queue of encoded events and an optional course filter."""
+
+    __slots__ = ('course_id', 'queue', 'overflowed')
+
+    def __init__(self, course_id: Optional[str], queue_size: int):
+        self.course_id = course_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class EventBroker:
+    """
+    Per-worker fan-out of upload/delete/comment events to SSE clients.
+
+    Write paths publish to one Redis channel; each worker runs a single pub/sub listener and hands
+    the already-encoded event to the queues of its own clients, indexed by course so an event only
+    touches the clients that asked for it. An idle client costs a queue and a heartbeat every
+    HEARTBEAT_INTERVAL seconds. Without Redis, events are still delivered to the local worker.
+    """
+
+    QUEUE_SIZE = 100
+
+    def __init__(self, cache: CacheService):
+        self.cache = cache
+        self.max_connections = settings.event_stream_max_connections
+        self.heartbeat_interval = settings.event_stream_heartbeat_seconds
+        # course_id -> subscribers; None holds the clients following every course
+        self.subscribers: Dict[Optional[str], Set[Subscriber]] = {}
+        self.connections = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        if self.cache.redis_available:
+            self.listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self.listener:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+            self.listener = None
+
+    async def _listen(self) -> None:
+        client = aioredis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            password=settings.redis_password if settings.redis_password else None,
+            db=settings.redis_db,
+            decode_responses=True,
+        )
+        delay = 1
+        try:
+            while True:
+                try:
+                    async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                        await pubsub.subscribe(EVENT_CHANNEL)
+                        delay = 1
+                        async for message in pubsub.listen():
+                            self._dispatch(json.loads(message['data']))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f'Event listener error: {e}. Reconnecting in {delay}s')
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 30)
+        finally:
+            await client.aclose()
+
+    def _dispatch(self, event: dict) -> None:
+        payload = format_event(event)
+        targets = [self.subscribers.get(None, ())]
+        if event.get('course_id'):
+            targets.append(self.subscribers.get(event['course_id'], ()))
+        for subscribers in targets:
+            for subscriber in subscribers:
+                try:
+                    subscriber.queue.put_nowait(payload)
+                except asyncio.QueueFull:
+                    # A client that can't keep up is disconnected; it reconnects and refetches
+                    subscriber.overflowed = True
+
+    def publish(self, event_type: str, data: dict, course_id: Optional[str] = None) -> None:
+        """Publish an event from a write path; never raises"""
+        event = {'type': event_type, 'course_id': course_id, 'data': data}
+        try:
+            if self.cache.publish(EVENT_CHANNEL, json.dumps(event, default=str)):
+                return
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self._dispatch, event)
+        except Exception as e:
+            print(f'Event publish error: {e}')
+
+    def check_capacity(self) -> None:
+        """Refuse a new stream with a 503 once this worker holds max_connections"""
+        if self.connections >= self.max_connections:
+            raise HTTPException(
+                status_code=503,
+                detail='Too many open event streams, please retry later.',
+                headers={'Retry-After': str(self.heartbeat_interval)},
+            )
+
+    def subscribe(self, course_id: Optional[str]) -> Subscriber:
+        self.check_capacity()
+        subscriber = Subscriber(course_id, self.QUEUE_SIZE)
+        self.subscribers.setdefault(course_id, set()).add(subscriber)
+        self.connections += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self.subscribers.get(subscriber.course_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self.subscribers[subscriber.course_id]
+        self.connections -= 1
+
+    async def stream(self, course_id: Optional[str]) -> AsyncIterator[bytes]:
+        """
+        Encoded events for one client, with a comment line as heartbeat when idle.
+
+        The client is subscribed once the body is first read, so a client gone before that never
+        holds a connection slot: an unstarted generator has no `finally` to release it.
+        """
+        retry = f'retry: {self.heartbeat_interval * 1000}\n\n'.encode()
+        try:
+            subscriber = self.subscribe(course_id)
+        except HTTPException:
+            # Filled up since the route checked; the client reconnects after `retry`
+            yield retry
+            return
+        try:
+            yield retry
+            while not subscriber.overflowed:
+                try:
+                    yield await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=self.heartbeat_interval
+                    )
+                except asyncio.TimeoutError:
+                    yield b': heartbeat\n\n'
+        finally:
+            self.unsubscribe(subscriber)
@@ -1,15 +1,44 @@
 import io
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Dict, Iterable, Optional
 from uuid import uuid4
 
 from minio import Minio
 from minio.error import S3Error
 
 from core.config import get_settings
+from services.cache import TTLCache
 
 settings = get_settings()
 
 
+class SigningStats:
+    """Presigned URL counters of this process"""
+
+    def __init__(self):
+        self.hits = 0
+        self.signed = 0
+        self.sign_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.signed
+        return {
+            'lookups': lookups,
+            'hits': self.hits,
+            'signed': self.signed,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'sign_seconds': self.sign_seconds,
+            'signs_per_second': self.signed / self.sign_seconds if self.sign_seconds else 0.0,
+        }
+
+
+# (bucket, object) -> presigned URL until the end of its signing window, shared by every
+# MinioService of the process
+signed_urls = TTLCache(maxsize=50000, ttl=settings.minio_presign_window_seconds)
+signing_stats = SigningStats()
+
+
 class MinioService:
     def __init__(self):
         # For anonymous access (no signature validation)
@@ -19,6 +48,21 @@ class MinioService:
             secret_key="",  # Empty for anonymous access
             secure=False,
         )
+        # Signs download links offline; the host is part of the signature, so it is the public one
+        self.signing_client = Minio(
+            endpoint=settings.minio_public_endpoint,
+            access_key=settings.minio_access_key,
+            secret_key=settings.minio_secret_key,
+            secure=False,
+            region=settings.minio_region,
+        )
+        self.internal_signing_client = Minio(
+            endpoint=settings.minio_endpoint,
+            access_key=settings.minio_access_key,
+            secret_key=settings.minio_secret_key,
+            secure=False,
+            region=settings.minio_region,
+        )
 
     def upload_file(self, bucket_name: str, file_name: str | None, user_id: str, data: bytes):
         try:
@@ -35,14 +79,110 @@ class MinioService:
             print(f'Error uploading file to MinIO: {e}')
             return False
 
-    def get_presigned_url(self, bucket_name: str, object_name: str, expires: int = 3600):
+    def store_archive(
+        self, bucket_name: str, object_name: str, data: BinaryIO, length: int, prefix: str
+    ) -> bool:
+        """Upload a finished archive and remove the archives under `prefix` stored before it"""
         try:
-            # For anonymous access, return direct URL instead of presigned URL
-            url = f"http://{settings.minio_public_endpoint}/{bucket_name}/{object_name}"
-            return url
+            self.minio_client.put_object(
+                bucket_name=bucket_name,
+                object_name=object_name,
+                data=data,
+                length=length,
+                content_type='application/zip',
+            )
+            # An archive stored meanwhile by another download is kept, it may be the current one
+            stored_at = self.minio_client.stat_object(bucket_name, object_name).last_modified
+            for stale in self.minio_client.list_objects(bucket_name, prefix=prefix):
+                if stale.object_name != object_name and stale.last_modified < stored_at:
+                    self.minio_client.remove_object(bucket_name, stale.object_name)
+            return True
         except S3Error as e:
-            print(f'Error getting presigned URL for bucket={bucket_name}, object={object_name}: {e}')
+            print(f'Error storing archive {object_name} in MinIO: {e}')
+            return False
+
+    @staticmethod
+    def download_window() -> Optional[int]:
+        """Start of the current signing window, or None when links are not signed"""
+        if not settings.minio_presigned_downloads:
             return None
+        window = settings.minio_presign_window_seconds
+        return int(time.time()) // window * window
+
+    def get_presigned_url(
+        self, bucket_name: str, object_name: str, expires: int = 3600
+    ) -> Optional[str]:
+        return self.get_presigned_urls(bucket_name, [object_name], expires).get(object_name)
+
+    def get_presigned_urls(
+        self, bucket_name: str, object_names: Iterable[str], expires: int = 3600
+    ) -> Dict[str, Optional[str]]:
+        """
+        Download URLs of many objects, valid for at least `expires` seconds.
+
+        Links are signed for the aligned window containing now (the larger of `expires` and
+        minio_presign_window_seconds) with the window start as the signing time, so every request
+        within a window gets the same URL: each object is signed once per window per process and
+        browsers can cache the link. The link stays valid until the end of the next window.
+        """
+        if not settings.minio_presigned_downloads:
+            return {
+                object_name: f"http://{settings.minio_public_endpoint}/{bucket_name}/{object_name}"
+                for object_name in object_names
+            }
+
+        return self._sign(self.signing_client, bucket_name, object_names, expires)
+
+    def get_internal_url(self, bucket_name: str, object_name: str) -> Optional[str]:
+        """Presigned GET on the internal endpoint, for the backend's own streaming downloads"""
+        return self.get_internal_urls(bucket_name, [object_name])[object_name]
+
+    def get_internal_urls(
+        self, bucket_name: str, object_names: Iterable[str]
+    ) -> Dict[str, Optional[str]]:
+        return self._sign(
+            self.internal_signing_client, bucket_name, object_names, 3600, key_prefix='internal:'
+        )
+
+    def _sign(
+        self,
+        client: Minio,
+        bucket_name: str,
+        object_names: Iterable[str],
+        expires: int,
+        key_prefix: str = '',
+    ) -> Dict[str, Optional[str]]:
+        window = max(expires, settings.minio_presign_window_seconds)
+        window_start = int(time.time()) // window * window
+        request_date = datetime.fromtimestamp(window_start, timezone.utc)
+        window_end = window_start + window
+
+        urls = {}
+        for object_name in object_names:
+            key = f'{key_prefix}{bucket_name}/{object_name}@{window_start}'
+            url = signed_urls.get(key)
+            if url is not None:
+                signing_stats.hits += 1
+            else:
+                start = time.perf_counter()
+                try:
+                    url = client.presigned_get_object(
+                        bucket_name,
+                        object_name,
+                        expires=timedelta(seconds=2 * window),
+                        request_date=request_date,
+                    )
+                except (S3Error, ValueError) as e:
+                    print(
+                        f'Error getting presigned URL for bucket={bucket_name}, '
+                        f'object={object_name}: {e}'
+                    )
+                else:
+                    signed_urls.set(key, url, expires_at=window_end)
+                    signing_stats.signed += 1
+                    signing_stats.sign_seconds += time.perf_counter() - start
+            urls[object_name] = url
+        return urls
 
     def delete_file(self, bucket_name: str, object_name: str):
         try:
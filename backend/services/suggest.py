@@ -0,0 +1,195 @@
+import heapq
+import mmap
+import os
+import struct
+from typing import List, Optional
+
+from schemas.course import CourseSuggestion
+from services.catalog import CatalogSnapshot, CourseCatalog
+
+# Layout (little endian):
+#   magic | u32 fingerprint length | fingerprint | f64 catalog load time | u32 record count (R)
+#   | u32 start key count (S) | u32 infix key count (I) | R + 1 u32 record offsets
+#   | S + I u32 key offsets | records | keys
+# A record is "course_id\x1fcourseName\x1finstructors"; a key is u16 length, key bytes and u32
+# record number. Start keys are the lowercased course ids and course names, infix keys every other
+# suffix of every lowercased course name; each section is sorted by utf-8 bytes, so a prefix query
+# is one binary search plus a forward scan per section. Offsets are absolute file positions.
+MAGIC = b'PXSG0002'
+U16 = struct.Struct('<H')
+U32 = struct.Struct('<I')
+F64 = struct.Struct('<d')
+SEPARATOR = '\x1f'
+# Infix matches collected before ranking, so one very common prefix can't turn into a full scan.
+# Start matches are few per prefix and always collected in full.
+MAX_CANDIDATES = 200
+
+
+def build_suggest_index(
+    path: str, snapshot: CatalogSnapshot, fingerprint: str, loaded_at: float
+) -> None:
+    """Write the index for `snapshot` next to `path` and atomically move it into place."""
+    records = [
+        SEPARATOR.join((c.course_id, c.courseName, c.instructors or '')).encode()
+        for c in snapshot.responses
+    ]
+    start_keys, infix_keys = [], []
+    for row, course in enumerate(snapshot.responses):
+        start_keys.append((course.course_id.lower().encode(), row))
+        name = course.courseName.lower()
+        for start in range(len(name)):
+            if not name[start].isspace():
+                (infix_keys if start else start_keys).append((name[start:].encode(), row))
+    start_keys.sort()
+    infix_keys.sort()
+    keys = [U16.pack(len(key)) + key + U32.pack(row) for key, row in start_keys + infix_keys]
+
+    header = MAGIC + U32.pack(len(fingerprint.encode())) + fingerprint.encode()
+    header += F64.pack(loaded_at)
+    header += U32.pack(len(records)) + U32.pack(len(start_keys)) + U32.pack(len(infix_keys))
+    position = len(header) + 4 * (len(records) + 1 + len(keys))
+    offsets = []
+    for item in records:
+        offsets.append(position)
+        position += len(item)
+    offsets.append(position)
+    for item in keys:
+        offsets.append(position)
+        position += len(item)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        f.writelines(records)
+        f.writelines(keys)
+    os.replace(tmp_path, path)
+
+
+class SuggestIndex:
+    """
+    Read side of the course-name suggestion index.
+
+    The index file is memory-mapped, so every worker process shares one page-cache copy instead of
+    holding its own trie. A stat() per lookup notices when the file has been replaced by a rebuild
+    and remaps it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.map: Optional[mmap.mmap] = None
+        self.identity: Optional[tuple] = None
+        self.fingerprint: Optional[str] = None
+        self.loaded_at = 0.0
+
+    def _open(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._close()
+            return
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity == self.identity:
+            return
+
+        self._close()
+        with open(self.path, 'rb') as f:
+            index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if index_map[: len(MAGIC)] != MAGIC:
+            print(f'Invalid suggest index at {self.path}')
+            index_map.close()
+            return
+
+        position = len(MAGIC)
+        (length,) = U32.unpack_from(index_map, position)
+        position += 4
+        self.fingerprint = index_map[position : position + length].decode()
+        position += length
+        (self.loaded_at,) = F64.unpack_from(index_map, position)
+        position += F64.size
+        self.record_count, self.start_count, self.infix_count = struct.unpack_from(
+            '<III', index_map, position
+        )
+        self.record_offsets = position + 12
+        self.key_offsets = self.record_offsets + 4 * (self.record_count + 1)
+        self.map = index_map
+        self.identity = identity
+
+    def _close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+        self.map = None
+        self.identity = None
+        self.fingerprint = None
+        self.loaded_at = 0.0
+
+    def ensure(self, catalog: CourseCatalog) -> None:
+        """
+        Rebuild the file if this worker's catalog snapshot is newer than the one it was built from.
+
+        Workers refresh their catalogs at different times; one still holding an older snapshot
+        keeps using the file a fresher worker wrote instead of rebuilding it back.
+        """
+        self._open()
+        if catalog.snapshot is None:
+            return
+        fingerprint = repr(catalog.fingerprint)
+        if self.map is not None and (
+            self.fingerprint == fingerprint or self.loaded_at >= catalog.loaded_at
+        ):
+            return
+        build_suggest_index(self.path, catalog.snapshot, fingerprint, catalog.loaded_at)
+        self._open()
+
+    def _key(self, index: int) -> tuple:
+        (position,) = U32.unpack_from(self.map, self.key_offsets + 4 * index)
+        (length,) = U16.unpack_from(self.map, position)
+        key = self.map[position + 2 : position + 2 + length]
+        (row,) = U32.unpack_from(self.map, position + 2 + length)
+        return key, row
+
+    def _lower_bound(self, prefix: bytes, low: int, high: int) -> int:
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle)[0] < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _record(self, row: int) -> CourseSuggestion:
+        start, end = struct.unpack_from('<II', self.map, self.record_offsets + 4 * row)
+        course_id, course_name, instructors = self.map[start:end].decode().split(SEPARATOR)
+        return CourseSuggestion(
+            course_id=course_id, courseName=course_name, instructors=instructors
+        )
+
+    def suggest(self, query: str, limit: int = 10) -> List[CourseSuggestion]:
+        self._open()
+        prefix = query.strip().lower().encode()
+        if self.map is None or not prefix:
+            return []
+
+        # Course ids and names starting with the query first, shorter ones first; infix matches
+        # only fill up what is left
+        ranked = {}
+        end = self.start_count
+        for index in range(self._lower_bound(prefix, 0, end), end):
+            key, row = self._key(index)
+            if not key.startswith(prefix):
+                break
+            ranked[row] = min(ranked.get(row, len(key)), len(key))
+        rows = heapq.nsmallest(limit, ranked, key=ranked.get)
+
+        if len(rows) < limit:
+            infix = {}
+            end = self.start_count + self.infix_count
+            low = self._lower_bound(prefix, self.start_count, end)
+            for index in range(low, min(low + MAX_CANDIDATES, end)):
+                key, row = self._key(index)
+                if not key.startswith(prefix):
+                    break
+                if row not in ranked:
+                    infix[row] = min(infix.get(row, len(key)), len(key))
+            rows += heapq.nsmallest(limit - len(rows), infix, key=infix.get)
+        return [self._record(row) for row in rows]
@@ -0,0 +1,27 @@
+import os
+
+# Settings are read from the environment at import time; the tests never reach these services
+for name, value in {
+    'MINIO_ACCESS_KEY': 'minio',
+    'MINIO_SECRET_KEY': 'minio-secret',
+    'MINIO_ENDPOINT': 'localhost:9000',
+    'MINIO_PUBLIC_ENDPOINT': 'localhost:9000',
+    'MINIO_FILE_BUCKET': 'files',
+    'MINIO_USER_AVATAR_BUCKET': 'avatars',
+    'POSTGRES_USER': 'postgres',
+    'POSTGRES_PASSWORD': 'postgres',
+    'POSTGRES_DB': 'pastexam',
+    'POSTGRES_HOST': 'localhost',
+    'POSTGRES_PORT': '5432',
+    'GOOGLE_REDIRECT_URI': 'http://localhost/callback',
+    'GOOGLE_CLIENT_ID': 'client-id',
+    'GOOGLE_CLIENT_SECRET': 'client-secret',
+    'GOOGLE_ALLOWED_DOMAINS': 'gs.ncku.edu.tw',
+    'JWT_SECRET_KEY': 'test-secret',
+    'JWT_ALGORITHM': 'HS256',
+    'JWT_ACCESS_TOKEN_EXPIRE_MINUTES': '60',
+    'FRONTEND_URL': 'http://localhost',
+    'FRONTEND_API_URL': 'http://localhost/api',
+    'FRONTEND_FILE_SERVER_URL': 'http://localhost/files',
+}.items():
+    os.environ.setdefault(name, value)
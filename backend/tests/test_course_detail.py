@@ -0,0 +1,115 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from crud import course_detail
+from crud.course import CourseCRUD
+from crud.course_detail import CourseDetailCRUD
+from crud.file import FileRow
+from crud.user import UserCRUD
+from schemas.course import CourseResponse, CourseStatsResponse
+from schemas.user import UploaderProfile
+
+COURSE_ID = 'A9001'
+UPLOADER_ID = '7f3c2a10-uploader'
+OTHER_ID = '91be04d2-other'
+
+
+class FakeCache:
+    """Just the course detail calls of CacheService, kept in a dict"""
+
+    def __init__(self):
+        self.details = {}
+
+    def get_versions(self, scopes):
+        return [('1', 0.0) for _ in scopes]
+
+    def get_course_detail_cache(self, course_id, version):
+        return self.details.get((course_id, version))
+
+    def set_course_detail_cache(self, course_id, version, detail_data, expire=900):
+        self.details[(course_id, version)] = detail_data
+        return True
+
+
+def _row(file_id, user_id, anonymous):
+    return FileRow(
+        file_id=file_id,
+        filename=f'{file_id}.pdf',
+        file_location=f'{user_id}/{file_id}-object',
+        user_id=user_id,
+        course_id=COURSE_ID,
+        exam_type='midterm',
+        info=None,
+        anonymous=anonymous,
+        timestamp=datetime(2024, 5, 1),
+    )
+
+
+@pytest.fixture
+def detail(monkeypatch):
+    course = CourseResponse(
+        semester='1131',
+        departmentId='A9',
+        serialNumber='001',
+        attributeCode='',
+        systemCode='',
+        forGrade='1',
+        forClass='',
+        category='',
+        courseName='Calculus',
+        courseNote='',
+        tags='',
+        credits='3',
+        instructors='',
+        course_id=COURSE_ID,
+    )
+    monkeypatch.setattr(
+        course_detail,
+        '_file_rows',
+        lambda db, statement: [
+            _row('anonymous-file', UPLOADER_ID, True),
+            _row('public-file', OTHER_ID, False),
+        ],
+    )
+    monkeypatch.setattr(
+        CourseCRUD,
+        'get_course_by_id',
+        lambda db, course_id, catalog=None: SimpleNamespace(data=course),
+    )
+    monkeypatch.setattr(
+        CourseCRUD,
+        'get_course_stats',
+        lambda db, course_ids: SimpleNamespace(
+            data=[CourseStatsResponse(course_id=COURSE_ID, total_files=2)]
+        ),
+    )
+    monkeypatch.setattr(
+        UserCRUD,
+        'get_uploader_profiles',
+        lambda db, user_ids, cache=None: {
+            user_id: UploaderProfile(user_id=user_id, username='someone') for user_id in user_ids
+        },
+    )
+    return CourseDetailCRUD()
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_anonymous_file_never_exposes_uploader_id(detail, cached):
+    cache = FakeCache()
+    if cached:
+        detail.get_course_detail(None, COURSE_ID, cache=cache)
+    files = detail.get_course_detail(None, COURSE_ID, cache=cache).data.files
+
+    anonymous, public = files
+    assert anonymous.file_id == 'anonymous-file'
+    for name, value in anonymous.model_dump(mode='json').items():
+        assert UPLOADER_ID not in str(value), name
+    assert anonymous.download_url == '/api/v1/file/anonymous-file/download'
+    # What is cached for the course is shared by every caller, so it must be clean as well
+    assert UPLOADER_ID not in str(cache.details)
+
+    assert public.user_id == OTHER_ID
+    assert public.uploader.user_id == OTHER_ID
+    assert public.file_location in public.download_url
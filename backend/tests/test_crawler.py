@@ -0,0 +1,117 @@
+import csv
+import os
+
+import pytest
+from sqlalchemy import MetaData, create_engine, select, text
+from sqlalchemy.orm import Session
+
+import crawler
+from models.course import Course
+from models.file import File
+from models.user import User
+from schemas.course import CourseResponse
+from services.catalog import CourseCatalog
+
+# The import runs COPY and upserts, so it needs a real Postgres; the tests use their own schema
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+SCHEMA = 'crawler_test'
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason='TEST_DATABASE_URL is not set')
+
+HEADER = [
+    'semester',
+    'departmentId',
+    'serialNumber',
+    'attributeCode',
+    'systemCode',
+    'forGrade',
+    'forClass',
+    'category',
+    'courseName',
+    'courseNote',
+    'tags',
+    'credits',
+    'instructors',
+]
+
+
+@pytest.fixture
+def engine():
+    with create_engine(TEST_DATABASE_URL).begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS {SCHEMA} CASCADE'))
+        conn.execute(text(f'CREATE SCHEMA {SCHEMA}'))
+    engine = create_engine(
+        TEST_DATABASE_URL, connect_args={'options': f'-csearch_path={SCHEMA},public'}
+    )
+    # The import needs no search indexes (nor pg_trgm for them), only the tables it touches
+    metadata = MetaData()
+    for table in (User.__table__, Course.__table__, File.__table__):
+        table.to_metadata(metadata).indexes.clear()
+    metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+    with create_engine(TEST_DATABASE_URL).begin() as conn:
+        conn.execute(text(f'DROP SCHEMA {SCHEMA} CASCADE'))
+
+
+def _write(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=HEADER)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({column: row.get(column, '') for column in HEADER})
+    return str(path)
+
+
+def _course(serial_number, **fields):
+    return {
+        'semester': '01131',
+        'departmentId': 'A9',
+        'serialNumber': serial_number,
+        'category': 'general',
+        'courseName': f'Course {serial_number}',
+        'credits': '2',
+        **fields,
+    }
+
+
+def test_empty_fields_are_imported_as_empty_strings(engine, tmp_path):
+    # forGrade, forClass, courseNote, tags, instructors... all left empty, as in the exports
+    path = _write(tmp_path / 'courses.csv', [_course('001')])
+
+    crawler.import_file(engine, path, chunk_size=10)
+
+    with Session(engine) as db:
+        course = db.scalars(select(Course)).one()
+        response = CourseResponse.model_validate(course)
+        assert (response.forGrade, response.tags, response.instructors) == ('', '', '')
+
+        catalog = CourseCatalog()
+        catalog.load(db)
+        assert catalog.get(db, 'A9001') == response
+
+
+def test_stale_courses_are_deleted_across_all_files(engine, tmp_path):
+    first = _write(tmp_path / 'first.csv', [_course('001')])
+    second = _write(tmp_path / 'second.csv', [_course('002')])
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                'INSERT INTO courses (semester, "departmentId", "serialNumber", "attributeCode", '
+                '"systemCode", "forGrade", "forClass", category, "courseName", "courseNote", '
+                'tags, credits, instructors, course_id) '
+                "VALUES ('01131', 'A9', '003', '', '', '', '', '', 'Dropped', '', '', '2', '', "
+                "'A9003')"
+            )
+        )
+
+    keys = []
+    for path in (first, second):
+        keys.extend(crawler.import_file(engine, path, chunk_size=10)[2])
+    report, deleted = crawler.delete_stale(engine, keys)
+
+    assert deleted == {'A9003'}
+    assert report['01131']['deleted'] == 1
+    with engine.connect() as conn:
+        remaining = conn.execute(text('SELECT course_id FROM courses ORDER BY 1')).scalars()
+        assert list(remaining) == ['A9001', 'A9002']
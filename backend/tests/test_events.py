@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import ClientDisconnect
+
+from routers.event import stream_events
+from services.events import EventBroker
+
+
+@pytest.fixture
+def events():
+    # No Redis: events are dispatched to the local worker only
+    broker = EventBroker(SimpleNamespace(redis_available=False))
+    broker.max_connections = 2
+    broker.heartbeat_interval = 1
+    return broker
+
+
+def _scope():
+    return {'type': 'http', 'asgi': {'version': '3.0', 'spec_version': '2.4'}}
+
+
+async def _receive():
+    return {'type': 'http.disconnect'}
+
+
+def test_client_gone_before_the_body_holds_no_connection(events):
+    async def scenario():
+        async def send(message):
+            # The client hung up: the response start can't be written
+            raise OSError('connection reset')
+
+        for _ in range(events.max_connections + 1):
+            response = await stream_events(course_id='A9001', events=events)
+            with pytest.raises(ClientDisconnect):
+                await response(_scope(), _receive, send)
+        assert events.connections == 0
+        assert events.subscribers == {}
+
+    asyncio.run(scenario())
+
+
+def test_stream_releases_its_connection_when_closed(events):
+    async def scenario():
+        response = await stream_events(course_id='A9001', events=events)
+        body = response.body_iterator
+        assert (await body.__anext__()).startswith(b'retry:')
+        assert events.connections == 1
+
+        events._dispatch({'type': 'file.created', 'course_id': 'A9001', 'data': {}})
+        assert (await body.__anext__()).startswith(b'event: file.created')
+
+        await body.aclose()
+        assert events.connections == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_worker_answers_503(events):
+    async def scenario():
+        bodies = []
+        for _ in range(events.max_connections):
+            response = await stream_events(course_id=None, events=events)
+            bodies.append(response.body_iterator)
+            await bodies[-1].__anext__()
+
+        with pytest.raises(HTTPException) as raised:
+            await stream_events(course_id=None, events=events)
+        assert raised.value.status_code == 503
+
+        for body in bodies:
+            await body.aclose()
+        assert events.connections == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,162 @@
+import asyncio
+import datetime
+import json
+import time
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from fastapi import HTTPException
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+from core.config import get_settings
+from crud import auth
+from crud.auth import GoogleAuthProvider
+
+settings = get_settings()
+EMAIL = f'student@{settings.google_allowed_domains}'
+
+
+class SigningKey:
+    """An RSA key with the self-signed certificate Google would publish for it"""
+
+    def __init__(self, key_id: str):
+        self.key_id = key_id
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, key_id)])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        self.certificate = certificate.public_bytes(serialization.Encoding.PEM).decode()
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        self.signer = crypt.RSASigner.from_string(pem, key_id)
+
+    def id_token(self, **claims) -> str:
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com',
+            'aud': settings.google_client_id,
+            'sub': '1234567890',
+            'email': EMAIL,
+            'name': 'Student',
+            'iat': now,
+            'exp': now + 3600,
+            **claims,
+        }
+        return google_jwt.encode(self.signer, payload).decode()
+
+
+class GoogleStandIn:
+    """Token and certificate endpoints of Google, served through an httpx.MockTransport"""
+
+    def __init__(self, key: SigningKey, max_age: int = 300):
+        self.published = [key]
+        self.id_token = key.id_token()
+        self.max_age = max_age
+        self.token_requests = []
+        self.certs_requests = 0
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if str(request.url) == settings.google_token_uri:
+            self.token_requests.append(parse_qs(request.content.decode()))
+            tokens = {'access_token': 'access', 'expires_in': 3599, 'id_token': self.id_token}
+            return httpx.Response(200, json=tokens)
+        if str(request.url) == settings.google_certs_uri:
+            self.certs_requests += 1
+            certs = {key.key_id: key.certificate for key in self.published}
+            return httpx.Response(
+                200,
+                content=json.dumps(certs),
+                headers={'cache-control': f'public, max-age={self.max_age}, must-revalidate'},
+            )
+        return httpx.Response(404)
+
+
+@pytest.fixture
+def google(monkeypatch):
+    stand_in = GoogleStandIn(SigningKey('key-1'))
+    monkeypatch.setattr(auth, 'get_http_client', lambda: stand_in.client)
+    return stand_in
+
+
+@pytest.fixture
+def provider():
+    provider = GoogleAuthProvider()
+    provider.user_crud = SimpleNamespace(
+        get_or_create_user=lambda db, google_user_info: SimpleNamespace(
+            data=SimpleNamespace(model_dump=lambda: google_user_info)
+        )
+    )
+    return provider
+
+
+def _login(provider, code='auth-code'):
+    return asyncio.run(provider.process_oauth_callback_async(None, code))
+
+
+def test_code_exchange(google, provider):
+    result = _login(provider)
+
+    (form,) = google.token_requests
+    assert form['code'] == ['auth-code']
+    assert form['grant_type'] == ['authorization_code']
+    assert form['client_id'] == [settings.google_client_id]
+    assert form['redirect_uri'] == [settings.google_redirect_uri]
+    assert result['user']['email'] == EMAIL
+    assert result['user']['user_id'] == '1234567890'
+    assert result['access_token'] == 'access'
+    assert result['token_expiry'] > time.time()
+
+
+def test_certs_are_cached_for_their_max_age(google, provider, monkeypatch):
+    _login(provider)
+    _login(provider)
+    assert google.certs_requests == 1
+
+    # Only the certs cache sees the clock move; the token itself stays fresh
+    later = time.time() + google.max_age + 1
+    monkeypatch.setattr(auth, 'time', SimpleNamespace(time=lambda: later))
+    _login(provider)
+    assert google.certs_requests == 2
+
+
+def test_certs_are_refetched_after_a_key_rotation(google, provider):
+    _login(provider)
+
+    rotated = SigningKey('key-2')
+    google.published = [rotated]
+    google.id_token = rotated.id_token()
+    assert _login(provider)['user']['email'] == EMAIL
+    assert google.certs_requests == 2
+
+
+@pytest.mark.parametrize(
+    'claims', [{'exp': int(time.time()) - 3600, 'iat': int(time.time()) - 7200}, {'aud': 'other'}]
+)
+def test_rejected_token_keeps_the_certs(google, provider, claims):
+    _login(provider)
+
+    google.id_token = google.published[0].id_token(**claims)
+    with pytest.raises(HTTPException) as raised:
+        _login(provider)
+    assert raised.value.status_code == 400
+    assert google.certs_requests == 1
@@ -0,0 +1,134 @@
+import asyncio
+import io
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO, List, Optional
+
+import httpx
+
+CHUNK_SIZE = 64 * 1024
+# Objects fetched ahead of the one being compressed, and chunks buffered per object: at most
+# PREFETCH_FILES * PREFETCH_CHUNKS * CHUNK_SIZE bytes (2 MiB) are held for one archive
+PREFETCH_FILES = 4
+PREFETCH_CHUNKS = 8
+
+
+@dataclass(slots=True)
+class ArchiveEntry:
+    name: str
+    url: str
+    timestamp: datetime
+
+
+class _ZipOutput(io.RawIOBase):
+    """Unseekable sink for ZipFile; what it was given is taken out with `drain`"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+async def _fetch(client: httpx.AsyncClient, url: str, queue: asyncio.Queue) -> None:
+    # Ends with None, or with the exception that stopped the download
+    try:
+        async with client.stream('GET', url) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_raw(CHUNK_SIZE):
+                await queue.put(chunk)
+        await queue.put(None)
+    except Exception as e:
+        await queue.put(e)
+
+
+class ArchiveStream:
+    """
+    A ZIP of storage objects, compressed while it streams.
+
+    Downloads of the next PREFETCH_FILES objects run concurrently with compression into bounded
+    queues, and compression runs in a worker thread (zlib releases the GIL), so the event loop only
+    moves chunks. Every byte sent is also written to `spool`, if given; `complete` tells whether
+    all entries made it in, i.e. whether the spooled copy is worth keeping.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        entries: List[ArchiveEntry],
+        spool: Optional[BinaryIO] = None,
+    ):
+        self.client = client
+        self.entries = entries
+        self.spool = spool
+        self.complete = False
+
+    def _emit(self, output: _ZipOutput) -> bytes:
+        data = output.drain()
+        if data and self.spool is not None:
+            self.spool.write(data)
+        return data
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        output = _ZipOutput()
+        archive = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED)
+        queues = [asyncio.Queue(maxsize=PREFETCH_CHUNKS) for _ in self.entries]
+        tasks: List[asyncio.Task] = []
+        skipped = 0
+        try:
+            for index, (entry, queue) in enumerate(zip(self.entries, queues)):
+                while len(tasks) < min(index + PREFETCH_FILES, len(self.entries)):
+                    position = len(tasks)
+                    tasks.append(
+                        asyncio.create_task(
+                            _fetch(self.client, self.entries[position].url, queues[position])
+                        )
+                    )
+
+                chunk = await queue.get()
+                if isinstance(chunk, Exception):
+                    # The exception text would carry the signed URL
+                    reason = (
+                        chunk.response.status_code
+                        if isinstance(chunk, httpx.HTTPStatusError)
+                        else type(chunk).__name__
+                    )
+                    print(f'Archive entry {entry.name} skipped: {reason}')
+                    skipped += 1
+                    continue
+
+                info = zipfile.ZipInfo(entry.name, date_time=entry.timestamp.timetuple()[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                writer = archive.open(info, 'w')
+                while chunk is not None:
+                    if isinstance(chunk, Exception):
+                        # Part of the entry is already sent, so the archive can't be finished
+                        raise chunk
+                    await asyncio.to_thread(writer.write, chunk)
+                    data = self._emit(output)
+                    if data:
+                        yield data
+                    chunk = await queue.get()
+                await asyncio.to_thread(writer.close)
+
+            await asyncio.to_thread(archive.close)
+            yield self._emit(output)
+            self.complete = skipped == 0
+        finally:
+            for task in tasks:
+                task.cancel()
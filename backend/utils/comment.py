@@ -1,5 +1,7 @@
 from fastapi.responses import JSONResponse
 
+from models.comment import Comment
+from schemas.comment.main import CommentResponse
 from schemas.common import CommentResponseModel
 
 
@@ -7,3 +9,13 @@ def error_response(e: Exception, status_code: int):
     error = CommentResponseModel(status='error', message=str(e), data=None)
     error.timestamp = error.timestamp.isoformat()
     return JSONResponse(status_code=status_code, content=error.model_dump())
+
+
+def comment_response(comment: Comment) -> CommentResponse:
+    return CommentResponse(
+        commenter_id=comment.commenter_id,
+        comment_time=comment.comment_time.isoformat(),
+        content=comment.content,
+        comment_id=comment.comment_id,
+        file_id=comment.file_id,
+    )
@@ -0,0 +1,93 @@
+import re
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+_CJK_RANGES = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff'
+
+# Han characters, Japanese kana and Hangul
+CJK_PATTERN = re.compile(f'[{_CJK_RANGES}]')
+# Either a run of CJK characters or a run of other letters/digits
+SEGMENT_PATTERN = re.compile(f'([{_CJK_RANGES}]+)|([^\\W_{_CJK_RANGES}]+)')
+# Anything outside letters/digits would be tsquery syntax, so it only separates search terms
+TERM_PATTERN = re.compile(r'[^\W_]+')
+
+
+def is_cjk(text: str) -> bool:
+    return CJK_PATTERN.search(text) is not None
+
+
+def search_terms(text: str) -> List[str]:
+    return [term.lower() for term in TERM_PATTERN.findall(text)]
+
+
+def _bigrams(run: str) -> List[str]:
+    return [run[i : i + 2] for i in range(len(run) - 1)]
+
+
+def index_tokens(text: str | None) -> List[str]:
+    """
+    Tokens stored for a course name.
+
+    Latin words are kept whole and lowercased; CJK runs are stored as every single character plus
+    every bigram, so any CJK substring can be looked up by exact tokens.
+    """
+    tokens = set()
+    for cjk, word in SEGMENT_PATTERN.findall(text or ''):
+        if cjk:
+            tokens.update(cjk)
+            tokens.update(_bigrams(cjk))
+        else:
+            tokens.add(word.lower())
+    return sorted(tokens)
+
+
+def query_tokens(text: str) -> List[str]:
+    """
+    CJK tokens a course name must contain to have `text` as a substring.
+
+    This is a necessary condition only (bigrams may occur apart), so callers recheck candidates
+    with a substring match. Latin words are left out: a partial word is not an indexed token.
+    """
+    tokens = []
+    for cjk, _ in SEGMENT_PATTERN.findall(text):
+        if cjk:
+            tokens.extend(_bigrams(cjk) if len(cjk) > 1 else [cjk])
+    return list(dict.fromkeys(tokens))
+
+
+# (entity table, id column, link table, Course column holding the comma-joined names)
+_RELATIONS = (
+    ('instructors', 'instructor_id', 'course_instructors', 'instructors'),
+    ('tags', 'tag_id', 'course_tags', 'tags'),
+)
+
+
+def sync_course_relations(conn: Connection) -> None:
+    """
+    Rebuild instructors/tags and their course links from the comma-joined course columns.
+
+    Plain SQL over the whole catalog (a few thousand rows), so it can run right after the crawler
+    has written courses; the caller commits.
+    """
+    for table, id_column, link_table, source in _RELATIONS:
+        names = (
+            f'SELECT c.course_id, trim(n.name) AS name FROM courses c '
+            f"CROSS JOIN LATERAL regexp_split_to_table(coalesce(c.{source}, ''), ',') AS n(name) "
+            f"WHERE trim(n.name) NOT IN ('', 'None')"
+        )
+        conn.execute(
+            text(
+                f'INSERT INTO {table} (name) SELECT DISTINCT name FROM ({names}) AS names '
+                'ON CONFLICT (name) DO NOTHING'
+            )
+        )
+        conn.execute(text(f'DELETE FROM {link_table}'))
+        conn.execute(
+            text(
+                f'INSERT INTO {link_table} (course_id, {id_column}) '
+                f'SELECT DISTINCT names.course_id, t.{id_column} FROM ({names}) AS names '
+                f'JOIN {table} t ON t.name = names.name'
+            )
+        )
@@ -0,0 +1,88 @@
+import mimetypes
+from urllib.parse import quote
+
+import httpx
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+CHUNK_SIZE = 64 * 1024
+
+# Ranges and validators are answered by storage, which knows the object's ETag
+FORWARDED_REQUEST_HEADERS = ('range', 'if-range', 'if-none-match', 'if-modified-since')
+FORWARDED_RESPONSE_HEADERS = (
+    'accept-ranges',
+    'content-length',
+    'content-range',
+    'content-type',
+    'etag',
+    'last-modified',
+)
+
+
+def content_disposition(filename: str, attachment: bool = False) -> str:
+    kind = 'attachment' if attachment else 'inline'
+    return f"{kind}; filename*=UTF-8''{quote(filename)}"
+
+
+async def stream_object(
+    client: httpx.AsyncClient, url: str, request: Request, filename: str, attachment: bool = False
+) -> Response:
+    """
+    Relay a storage GET to the client chunk by chunk.
+
+    Range, If-Range, If-None-Match and If-Modified-Since go to storage as they are, and its
+    200/206/304/416 answer comes back with the matching headers, so PDF viewers can fetch pages
+    lazily. Only one chunk per download is in memory; a slow client slows the reads from storage
+    instead of buffering, and waiting on either side holds no thread.
+    """
+    headers = {
+        name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request.headers
+    }
+    try:
+        upstream = await client.send(client.build_request('GET', url, headers=headers), stream=True)
+    except httpx.HTTPError as e:
+        print(f'Storage download error: {e}')
+        raise HTTPException(status_code=502, detail='File storage unavailable')
+
+    response_headers = {
+        name: upstream.headers[name]
+        for name in FORWARDED_RESPONSE_HEADERS
+        if name in upstream.headers
+    }
+    if upstream.status_code in (200, 206):
+        # Objects are stored without a content type; viewers need the real one to render inline
+        if response_headers.get('content-type', 'application/octet-stream') == (
+            'application/octet-stream'
+        ):
+            response_headers['content-type'] = (
+                mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            )
+        response_headers['content-disposition'] = content_disposition(filename, attachment)
+        response_headers['cache-control'] = 'private, no-cache'
+
+        async def body():
+            try:
+                async for chunk in upstream.aiter_raw(CHUNK_SIZE):
+                    yield chunk
+            finally:
+                await upstream.aclose()
+
+        # The background close also covers a client gone before the first chunk
+        return StreamingResponse(
+            body(),
+            status_code=upstream.status_code,
+            headers=response_headers,
+            background=BackgroundTask(upstream.aclose),
+        )
+
+    await upstream.aclose()
+    if upstream.status_code in (304, 412, 416):
+        # Storage's own error body isn't relayed
+        response_headers.pop('content-length', None)
+        response_headers.pop('content-type', None)
+        return Response(status_code=upstream.status_code, headers=response_headers)
+    if upstream.status_code == 404:
+        raise HTTPException(status_code=404, detail='File content not found')
+    print(f'Storage download failed with status {upstream.status_code}')
+    raise HTTPException(status_code=502, detail='File storage unavailable')
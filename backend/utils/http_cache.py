@@ -0,0 +1,70 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+
+class CacheValidator:
+    """
+    ETag/Last-Modified for a GET response, derived from version counters instead of the body.
+
+    The ETag hashes the request path and query with the versions the response depends on, so it
+    is known before the query runs; `check` answers a matching If-None-Match (or a recent enough
+    If-Modified-Since) with 304 right away. Without versions (Redis down, catalog not loaded) it
+    does nothing. Responses are stored with `no-cache`, so browsers and the nginx front cache keep
+    them but revalidate every time.
+    """
+
+    def __init__(
+        self, request: Request, versions: Optional[List[Tuple[str, float]]], private: bool = False
+    ):
+        self.request = request
+        self.private = private
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[float] = None
+        if versions is not None:
+            key = '|'.join(
+                [request.url.path, request.url.query, *(str(version) for version, _ in versions)]
+            )
+            self.etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+            self.last_modified = max((modified for _, modified in versions), default=0.0)
+
+    @property
+    def headers(self) -> dict:
+        if self.etag is None:
+            return {}
+        headers = {
+            'ETag': self.etag,
+            'Last-Modified': formatdate(self.last_modified, usegmt=True),
+            'Cache-Control': 'private, no-cache' if self.private else 'public, no-cache',
+        }
+        if self.private:
+            headers['Vary'] = 'Cookie'
+        return headers
+
+    def _not_modified(self) -> bool:
+        if_none_match = self.request.headers.get('if-none-match')
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in tags or self.etag.removeprefix('W/') in tags
+
+        if_modified_since = self.request.headers.get('if-modified-since')
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            # HTTP dates have whole seconds
+            return int(self.last_modified) <= since
+        return False
+
+    def check(self) -> None:
+        """Raise a 304 if the client's copy is current"""
+        if self.etag is not None and self._not_modified():
+            raise HTTPException(status_code=304, headers=self.headers)
+
+    def apply(self, response: Response) -> Response:
+        response.headers.update(self.headers)
+        return response
@@ -0,0 +1,21 @@
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class ModelResponse(Response):
+    """
+    JSON response rendered straight from an already-validated pydantic model.
+
+    Returning a Response from a route makes FastAPI skip validating the result against
+    response_model and the jsonable_encoder pass; pydantic-core writes the bytes in one call. Only
+    for models whose data is already response schemas, not ORM objects.
+    """
+
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return super().render(content)